@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+
+"""admission.py
+
+Udacity conference server-side Python App Engine admission control;
+memcache-backed token buckets per conference and per user shed excess
+write traffic before it reaches a Datastore transaction
+
+"""
+
+import math
+import time
+
+from google.appengine.api import memcache
+
+from models import RateLimitedException
+
+from settings import RATE_LIMITS
+
+MEMCACHE_BUCKET_KEY = "TOKEN_BUCKET:%s:%s:%s"
+CAS_RETRIES = 3
+
+
+def _take(key, rate, burst):
+    """Take one token from a bucket; return 0 if admitted, else the
+    number of seconds until a token is available.
+    """
+    client = memcache.Client()
+    # keep idle buckets around long enough to refill completely
+    timeout = max(60, int(math.ceil(2.0 * burst / rate)))
+    seen = False
+    for _ in range(CAS_RETRIES):
+        state = client.gets(key)
+        now = time.time()
+        if state is None:
+            if client.add(key, (burst - 1.0, now), time=timeout):
+                return 0
+            continue
+        seen = True
+        tokens, last = state
+        tokens = min(burst, tokens + (now - last) * rate)
+        if tokens < 1:
+            return (1 - tokens) / rate
+        if client.cas(key, (tokens - 1, now), time=timeout):
+            return 0
+    # fail open if memcache is unavailable; shed if the bucket is contended
+    return 1.0 / rate if seen else 0
+
+
+def admit(endpoint, conference=None, user=None):
+    """Admit a call to a write endpoint or raise RateLimitedException
+    with a retry-after hint.
+    """
+    limits = RATE_LIMITS.get(endpoint, {})
+    wait = 0
+    for scope, ident in (('conference', conference), ('user', user)):
+        if ident and scope in limits:
+            rate, burst = limits[scope]
+            wait = max(wait, _take(
+                MEMCACHE_BUCKET_KEY % (endpoint, scope, ident), rate, burst))
+    if wait:
+        raise RateLimitedException(
+            'Too many requests; retry after %d seconds.' % math.ceil(wait))
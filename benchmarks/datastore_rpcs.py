@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+"""datastore_rpcs.py
+
+Udacity conference list-endpoint read benchmark; seeds the SDK testbed
+datastore, serves the same list requests repeatedly and counts the
+datastore_v3 calls and the entities and keys they read, for the full-entity
+queries the list endpoints used to run and for the endpoints as they are
+now (keys-only query, then get_multi through the ndb caches). Needs
+Python 2.7 and the App Engine Python SDK:
+
+    python benchmarks/datastore_rpcs.py --sdk ~/google_appengine
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ORGANIZER = 'bench@example.com'
+SESSION_TYPES = ['lecture', 'workshop']
+
+
+class RpcCounter(object):
+    """datastore_v3 post-call hook counting calls and what they read."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = defaultdict(int)
+        self.entities = 0
+        self.keys = 0
+
+    def __call__(self, service, call, request, response):
+        self.calls[call] += 1
+        if call == 'Get':
+            self.entities += sum(1 for result in response.entity_list()
+                                 if result.has_entity())
+        elif call in ('RunQuery', 'Next'):
+            if response.keys_only():
+                self.keys += response.result_size()
+            else:
+                self.entities += response.result_size()
+
+
+def _setUpSdk(sdk):
+    """Put the app and the SDK libraries on sys.path."""
+    sys.path[0:0] = [ROOT, sdk]
+    import dev_appserver
+    dev_appserver.fix_sys_path()
+    os.environ.setdefault('APPLICATION_ID', 'dev~datastore-rpcs')
+    # what endpoints sets for a signed-in caller
+    os.environ['ENDPOINTS_AUTH_EMAIL'] = ORGANIZER
+    os.environ['ENDPOINTS_AUTH_DOMAIN'] = ''
+
+
+def seed(conferences, sessions):
+    """Store conferences with sessions each; return their keys."""
+    from google.appengine.ext import ndb
+    from models import Conference, Profile, Session
+
+    p_key = Profile(id=ORGANIZER, displayName='Bench',
+                    mainEmail=ORGANIZER).put()
+    c_keys = ndb.put_multi([
+        Conference(parent=p_key, name='Conference %03d' % i,
+                   city='Paris', topics=['Python'], month=6,
+                   maxAttendees=100, seatsAvailable=100,
+                   organizerUserId=ORGANIZER)
+        for i in range(conferences)])
+    ndb.put_multi([
+        Session(parent=c_key, name='Session %03d' % j, mainEmail=ORGANIZER,
+                typeOfSession=SESSION_TYPES[j % len(SESSION_TYPES)],
+                conferenceCity='Paris', conferenceTopics=['Python'],
+                conferenceMonth=6)
+        for c_key in c_keys for j in range(sessions)])
+    return c_keys
+
+
+def listCalls(c_key):
+    """Return [(endpoint, endpoint call, full-entity query it replaced)]."""
+    from google.appengine.ext import ndb
+    from protorpc import message_types
+    from conference import ConferenceApi, SESSION_REQUEST
+    from models import (Conference, ConferenceQueryForms, Profile, Session,
+                        SessionQueryForms)
+
+    api = ConferenceApi()
+    sessionsOf = SESSION_REQUEST.combined_message_class(
+        websafeConferenceKey=c_key.urlsafe())
+    sessionsByType = SESSION_REQUEST.combined_message_class(
+        websafeConferenceKey=c_key.urlsafe(), sessionType=SESSION_TYPES[0])
+    p_key = ndb.Key(Profile, ORGANIZER)
+    return [
+        ('queryConferences',
+         lambda: api.queryConferences(ConferenceQueryForms()),
+         lambda: api._getQuery(ConferenceQueryForms()).fetch()),
+        ('getConferencesCreated',
+         lambda: api.getConferencesCreated(message_types.VoidMessage()),
+         lambda: (Conference.query(ancestor=p_key).fetch(), p_key.get())),
+        ('getConferenceSessions',
+         lambda: api.getConferenceSessions(sessionsOf),
+         lambda: Session.query(ancestor=c_key).fetch()),
+        ('getConferenceSessionsByType',
+         lambda: api.getConferenceSessionsByType(sessionsByType),
+         lambda: Session.query(ancestor=c_key).filter(
+             Session.typeOfSession == SESSION_TYPES[0]).fetch()),
+        ('queryAllSessions',
+         lambda: api.queryAllSessions(SessionQueryForms()),
+         lambda: api._getSessionQuery(SessionQueryForms()).fetch()),
+    ]
+
+
+def serve(call, requests, counter):
+    """Serve call as requests separate requests; return what they read."""
+    from google.appengine.api import memcache
+    from google.appengine.ext import ndb
+
+    # every variant starts from a cold memcache, as after a deploy
+    memcache.flush_all()
+    counter.reset()
+    for _ in range(requests):
+        # each request gets a fresh ndb in-context cache
+        ndb.get_context().clear_cache()
+        call()
+    return sum(counter.calls.values()), counter.entities, counter.keys
+
+
+def report(label, stats, requests):
+    rpcs, entities, keys = stats
+    print('%-40s %6d RPCs %8d entities %8d keys   %7.1f entities/request' % (
+        label, rpcs, entities, keys, float(entities) / requests))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--sdk', required=True,
+                        help='path of the google_appengine SDK directory')
+    parser.add_argument('--conferences', type=int, default=50)
+    parser.add_argument('--sessions', type=int, default=10,
+                        help='sessions per conference')
+    parser.add_argument('--requests', type=int, default=20,
+                        help='requests served per endpoint')
+    args = parser.parse_args()
+    _setUpSdk(os.path.abspath(os.path.expanduser(args.sdk)))
+
+    from google.appengine.api import apiproxy_stub_map
+    from google.appengine.datastore import datastore_stub_util
+    from google.appengine.ext import testbed
+
+    bed = testbed.Testbed()
+    bed.activate()
+    try:
+        # apply writes at once so global queries see every seeded entity
+        bed.init_datastore_v3_stub(
+            consistency_policy=datastore_stub_util.
+            PseudoRandomHRConsistencyPolicy(probability=1))
+        bed.init_memcache_stub()
+        bed.init_taskqueue_stub(root_path=ROOT)
+        c_keys = seed(args.conferences, args.sessions)
+
+        counter = RpcCounter()
+        apiproxy_stub_map.apiproxy.GetPostCallHooks().Append(
+            'datastore_rpcs', counter, 'datastore_v3')
+        print('%d conferences x %d sessions, %d requests per endpoint\n' % (
+            args.conferences, args.sessions, args.requests))
+        for name, endpoint, fullEntityQuery in listCalls(c_keys[0]):
+            report('%s: full-entity query' % name,
+                   serve(fullEntityQuery, args.requests, counter),
+                   args.requests)
+            report('%s: keys-only + get_multi' % name,
+                   serve(endpoint, args.requests, counter), args.requests)
+    finally:
+        bed.deactivate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+"""import_time.py
+
+Udacity conference cold-start benchmark; times a fresh-interpreter import
+of the app modules (what a new instance pays before its first request) in
+the working tree and, with --before, in an earlier git revision. Needs
+Python 2.7 and the App Engine Python SDK:
+
+    python benchmarks/import_time.py --sdk ~/google_appengine --before HEAD~20
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# run in a fresh interpreter per sample so nothing is already imported
+CHILD = '''
+import os, sys, time
+sys.path[0:0] = [%(tree)r, %(sdk)r]
+import dev_appserver
+dev_appserver.fix_sys_path()
+os.environ.setdefault('APPLICATION_ID', 'dev~import-time')
+os.environ.setdefault('SERVER_SOFTWARE', 'Development/import-time')
+os.chdir(%(tree)r)
+began = time.time()
+import %(module)s
+print(time.time() - began)
+'''
+
+
+def timeImport(tree, sdk, module, runs):
+    """Return sorted import times in seconds of module in tree."""
+    times = []
+    for _ in range(runs):
+        out = subprocess.check_output(
+            [sys.executable, '-c',
+             CHILD % {'tree': tree, 'sdk': sdk, 'module': module}])
+        times.append(float(out.strip().splitlines()[-1]))
+    return sorted(times)
+
+
+def exportRevision(rev):
+    """Return a temporary directory holding the tree of a git revision."""
+    tree = tempfile.mkdtemp(prefix='import-time-')
+    archive = subprocess.Popen(['git', 'archive', rev], cwd=ROOT,
+                               stdout=subprocess.PIPE)
+    subprocess.check_call(['tar', '-x', '-C', tree], stdin=archive.stdout)
+    archive.wait()
+    return tree
+
+
+def report(label, times):
+    print('%-28s median %7.1f ms   min %7.1f ms   max %7.1f ms' % (
+        label, 1000 * times[len(times) // 2], 1000 * times[0],
+        1000 * times[-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--sdk', required=True,
+                        help='path of the google_appengine SDK directory')
+    parser.add_argument('--before', help='git revision to compare against')
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--module', action='append',
+                        help='module to import (default: conference, main)')
+    args = parser.parse_args()
+    sdk = os.path.abspath(os.path.expanduser(args.sdk))
+    modules = args.module or ['conference', 'main']
+
+    trees = [('working tree', ROOT)]
+    if args.before:
+        trees.insert(0, (args.before, exportRevision(args.before)))
+    try:
+        for module in modules:
+            for label, tree in trees:
+                report('%s: %s' % (module, label),
+                       timeImport(tree, sdk, module, args.runs))
+    finally:
+        if args.before:
+            shutil.rmtree(trees[0][1])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+
+"""build.py
+
+Udacity conference static asset build; bundles and minifies the JS with the
+partials inlined into Angular's $templateCache, strips CSS rules no template
+or script refers to, and writes content-fingerprinted files plus the page
+that loads them. Run before deploying:
+
+    python build.py
+
+"""
+
+from __future__ import print_function
+
+import hashlib
+import io
+import json
+import os
+import re
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, 'static')
+PARTIALS_DIR = os.path.join(STATIC_DIR, 'partials')
+CSS_DIR = os.path.join(STATIC_DIR, 'bootstrap', 'css')
+
+INDEX_SOURCE = os.path.join(ROOT, 'templates', 'index.html')
+INDEX_OUTPUT = os.path.join(ROOT, 'templates', 'dist', 'index.html')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+DIST_URL = '/dist'
+
+JS_SOURCES = ['js/app.js', 'js/controllers.js']
+CSS_SOURCES = ['bootstrap-cosmo.css', 'main.css', 'offcanvas.css']
+APP_MODULE = 'conferenceApp'
+PARTIALS_URL = '/partials/'
+
+# classes only added at runtime by bootstrap.js and the ui-bootstrap
+# templates (modal, datepicker popup), or built from {{ }} in templates
+SAFELIST = frozenset(['active', 'collapse', 'collapsing', 'disabled', 'fade',
+                      'in', 'open'])
+SAFELIST_PREFIXES = ('alert-', 'btn', 'dropdown', 'glyphicon-chevron', 'modal',
+                     'pull-', 'table', 'text-')
+
+FINGERPRINT_LENGTH = 10
+
+# - - - JS - - - - - - - - - - - - - - - - - - - - - - - - -
+
+# a '/' after one of these (or at the start) opens a regex literal
+_REGEX_PRECEDERS = '(,=:[!&|?{};+-*%<>~^'
+
+
+def minifyJs(source):
+    """Return JS with comments, indentation and blank lines removed.
+
+    Line breaks are kept so automatic semicolon insertion behaves exactly
+    as in the source; strings and regex literals pass through untouched.
+    """
+    out = []
+    i, n = 0, len(source)
+    last = ''  # last significant character written
+    while i < n:
+        c = source[i]
+        if c in '\'"':
+            j = i + 1
+            while j < n and source[j] != c:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            last = c
+            i = j + 1
+        elif c == '/' and source[i + 1:i + 2] == '/':
+            while i < n and source[i] != '\n':
+                i += 1
+        elif c == '/' and source[i + 1:i + 2] == '*':
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            out.append(' ')
+        elif c == '/' and (not last or last in _REGEX_PRECEDERS):
+            j, inClass = i + 1, False
+            while j < n and (inClass or source[j] != '/'):
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    inClass = True
+                elif source[j] == ']':
+                    inClass = False
+                j += 1
+            out.append(source[i:j + 1])
+            last = '/'
+            i = j + 1
+        else:
+            out.append(c)
+            if not c.isspace():
+                last = c
+            i += 1
+
+    lines = []
+    for line in ''.join(out).split('\n'):
+        line = line.strip()
+        if line:
+            lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def templateCacheJs(partials):
+    """Return JS putting {url: html} into the app's $templateCache."""
+    puts = ''.join('$templateCache.put(%s,%s);\n' % (json.dumps(url),
+                                                     json.dumps(html))
+                   for url, html in sorted(partials.items()))
+    return ("angular.module('%s').run(['$templateCache',"
+            "function($templateCache){\n%s}]);\n" % (APP_MODULE, puts))
+
+
+def _collapseHtml(html):
+    """Return html with indentation and blank lines removed."""
+    return '\n'.join(line.strip() for line in html.splitlines()
+                     if line.strip())
+
+# - - - CSS - - - - - - - - - - - - - - - - - - - - - - - - -
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_SELECTOR_NAMES = re.compile(r'[.#](-?[_a-zA-Z][\w-]*)')
+_WORD = re.compile(r'[\w-]+')
+
+
+def usedNames(sources):
+    """Return every word in the given texts; any class or id a selector
+    names must be among them for the rule to be kept.
+    """
+    names = set()
+    for text in sources:
+        names.update(_WORD.findall(text))
+    return names
+
+
+def _selectorUsed(selector, used):
+    """Return True if every class and id in a selector is in use."""
+    for name in _SELECTOR_NAMES.findall(selector):
+        if name not in used and name not in SAFELIST and \
+                not name.startswith(SAFELIST_PREFIXES):
+            return False
+    return True
+
+
+def _splitRules(css):
+    """Yield (prelude, body) of each top-level rule of comment-free css."""
+    i, n = 0, len(css)
+    while i < n:
+        brace = css.find('{', i)
+        semi = css.find(';', i)
+        if brace < 0:
+            return
+        if 0 <= semi < brace:
+            # @import / @charset statement
+            yield css[i:semi + 1].strip(), None
+            i = semi + 1
+            continue
+        depth, j = 1, brace + 1
+        while j < n and depth:
+            if css[j] == '{':
+                depth += 1
+            elif css[j] == '}':
+                depth -= 1
+            j += 1
+        yield css[i:brace].strip(), css[brace + 1:j - 1]
+        i = j
+
+
+def purgeCss(css, used):
+    """Return css without rules whose selectors are all unused."""
+    css = _CSS_COMMENT.sub('', css)
+    out = []
+    for prelude, body in _splitRules(css):
+        if body is None:
+            out.append(prelude)
+        elif prelude.startswith('@media') or prelude.startswith('@supports'):
+            inner = purgeCss(body, used)
+            if inner:
+                out.append('%s{%s}' % (prelude, inner))
+        elif prelude.startswith('@'):
+            # @font-face, @keyframes, @-ms-viewport, ...
+            out.append('%s{%s}' % (prelude, _minifyDeclarations(body)))
+        else:
+            selectors = [s.strip() for s in prelude.split(',')
+                         if _selectorUsed(s, used)]
+            if selectors:
+                out.append('%s{%s}' % (','.join(selectors),
+                                       _minifyDeclarations(body)))
+    return '\n'.join(out)
+
+
+def _minifyDeclarations(body):
+    """Return a declaration block with whitespace collapsed."""
+    body = re.sub(r'\s+', ' ', body).strip()
+    body = re.sub(r'\s*([;:{}])\s*', r'\1', body)
+    return body.rstrip(';')
+
+
+def _hoistImports(css):
+    """Move @import statements of concatenated files to the top."""
+    imports = re.findall(r'^@import[^;]*;\n?', css, re.M)
+    rest = re.sub(r'^@import[^;]*;\n?', '', css, flags=re.M)
+    return ''.join(imports) + rest
+
+# - - - Output - - - - - - - - - - - - - - - - - - - - - - - -
+
+def _read(path):
+    with io.open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def _write(path, text):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def fingerprint(name, text):
+    """Return name with a content hash before its extension."""
+    digest = hashlib.md5(text.encode('utf-8')).hexdigest()
+    base, ext = os.path.splitext(name)
+    return '%s.%s%s' % (base, digest[:FINGERPRINT_LENGTH], ext)
+
+
+def _replaceBlock(html, kind, tag):
+    """Replace the <!-- build:kind --> ... <!-- endbuild --> block."""
+    pattern = re.compile(r'[ \t]*<!-- build:%s -->.*?<!-- endbuild -->' % kind,
+                         re.S)
+    if not pattern.search(html):
+        raise ValueError('No build:%s block in %s' % (kind, INDEX_SOURCE))
+    return pattern.sub(lambda m: tag, html, count=1)
+
+
+def build():
+    """Write fingerprinted bundles and the page that loads them."""
+    partials = {}
+    for name in sorted(os.listdir(PARTIALS_DIR)):
+        if name.endswith('.html'):
+            partials[PARTIALS_URL + name] = _collapseHtml(
+                _read(os.path.join(PARTIALS_DIR, name)))
+
+    scripts = [_read(os.path.join(STATIC_DIR, src)) for src in JS_SOURCES]
+    js = minifyJs('\n'.join(scripts)) + templateCacheJs(partials)
+
+    index = _read(INDEX_SOURCE)
+    used = usedNames([index] + scripts + list(partials.values()))
+    css = _hoistImports('\n'.join(
+        _read(os.path.join(CSS_DIR, src)) for src in CSS_SOURCES))
+    css = purgeCss(css, used) + '\n'
+
+    if os.path.isdir(DIST_DIR):
+        for stale in os.listdir(DIST_DIR):
+            os.remove(os.path.join(DIST_DIR, stale))
+    jsName = fingerprint('app.js', js)
+    cssName = fingerprint('app.css', css)
+    _write(os.path.join(DIST_DIR, jsName), js)
+    _write(os.path.join(DIST_DIR, cssName), css)
+
+    index = _replaceBlock(index, 'css', '    <link rel="stylesheet" href="%s/%s">'
+                          % (DIST_URL, cssName))
+    index = _replaceBlock(index, 'js', '<script src="%s/%s"></script>'
+                          % (DIST_URL, jsName))
+    _write(INDEX_OUTPUT, index)
+
+    for name, text in ((jsName, js), (cssName, css)):
+        print('%s/%s  %d bytes' % (DIST_URL, name, len(text.encode('utf-8'))))
+    print(os.path.relpath(INDEX_OUTPUT, ROOT))
+
+
+if __name__ == '__main__':
+    build()
@@ -14,6 +14,9 @@ __author__ = 'wesc+api@google.com (Wesley Chun)'
 
 
 from datetime import datetime
+from datetime import timedelta
+import hashlib
+import heapq
 import json
 import os
 import time
@@ -23,8 +26,8 @@ from protorpc import messages
 from protorpc import message_types
 from protorpc import remote
 
-from google.appengine.api import urlfetch
 from google.appengine.ext import ndb
+from google.appengine.datastore.datastore_query import Cursor
 from google.appengine.api import memcache
 from google.appengine.api import taskqueue
 
@@ -35,19 +38,42 @@ from models import TeeShirtSize
 from models import Conference
 from models import ConferenceForm
 from models import ConferenceForms
+from models import ConferenceLookupForm
+from models import ConferenceLookupForms
 from models import ConferenceQueryForm
 from models import ConferenceQueryForms
 from models import BooleanMessage
+from models import FacetCount
+from models import FacetForm
+from models import FacetForms
+from models import FacetRecount
 from models import ConflictException
+from models import SeatsAvailableForm
+from models import Leaderboard
+from models import WaitlistEntry
+from models import WaitlistForm
 from models import StringMessage
+from models import SyncForm
+from models import Tombstone
+from models import WebsafeKeysForm
+from models import WishlistConflictForm
+from models import WishlistConflictForms
 from models import Session
 from models import SessionForm
 from models import SessionForms
+from models import SessionLookupForm
+from models import SessionLookupForms
 from models import SessionQueryForm
 from models import SessionQueryForms
+from models import SessionSearchForm
 from models import TypeOfSession
 
 from utils import getUserId
+from utils import LocalCache
+import admission
+import counters
+import notifications
+import related
 
 from settings import WEB_CLIENT_ID
 
@@ -55,6 +81,41 @@ EMAIL_SCOPE = endpoints.EMAIL_SCOPE
 API_EXPLORER_CLIENT_ID = endpoints.API_EXPLORER_CLIENT_ID
 MEMCACHE_ANNOUNCEMENTS_KEY = "RECENT_ANNOUNCEMENTS"
 MEMCACHE_SPEAKER_KEY = "SPEAKER_ANNOUNCEMENTS"
+# per-announcement counter giving instances a shared version order
+MEMCACHE_VERSION_KEY = "%s:VERSION"
+# announcements are read on every page load; serve them from the instance
+# for a few seconds instead of hitting one memcache key each time
+ANNOUNCEMENT_LOCAL_TTL = 10
+ANNOUNCEMENT_CACHE = LocalCache(ANNOUNCEMENT_LOCAL_TTL)
+MEMCACHE_SEATS_KEY = "SEATS_AVAILABLE:%s"
+# bounds how long a drifted seat count can be served
+MEMCACHE_SEATS_TIMEOUT = 10 * 60
+# conferences with 0 < seats <= this are kept warm by the cron job, fewest
+# seats first and at most HOT_SEATS_LIMIT per run
+HOT_SEATS_THRESHOLD = 100
+HOT_SEATS_LIMIT = 200
+# trending conferences a new instance loads before serving
+WARMUP_CONFERENCES = 10
+# trending conferences: registration events are counted on sharded counters
+# and folded into a time-decayed, bounded leaderboard by a cron job
+TRENDING_COUNTER_GROUP = "registrations"
+TRENDING_LEADERBOARD_ID = "trendingConferences"
+MEMCACHE_TRENDING_KEY = "TRENDING_CONFERENCES"
+TRENDING_HALF_LIFE = 24 * 60 * 60
+# candidates kept beyond the top N so risers are not lost
+TRENDING_CAPACITY = 200
+TRENDING_DEFAULT_LIMIT = 10
+# related conferences: topic-overlap candidates considered before the
+# upcoming/city/month re-ranking, and bonuses for the optional matches
+RELATED_CANDIDATES = 100
+RELATED_DEFAULT_LIMIT = 10
+RELATED_CITY_BONUS = 0.5
+RELATED_MONTH_BONUS = 0.25
+# waiters promoted per promotion task before it chains itself
+WAITLIST_PROMOTE_BATCH = 20
+
+# per-instance serializer plan, see _conferenceCopyPlan()
+_CONFERENCE_COPY_PLAN = None
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
@@ -81,11 +142,68 @@ FIELDS =    {
             'MAX_ATTENDEES': 'maxAttendees',
             }
 
+# filter fields with precomputed conference counts
+FACET_FIELDS = {
+            'CITY': 'city',
+            'TOPIC': 'topics',
+            'MONTH': 'month',
+            }
+FACET_COUNTER_GROUP = "conferenceFacet:%s"
+MEMCACHE_FACETS_KEY = "CONFERENCE_FACETS:v2:%s"
+MEMCACHE_FACETS_TIMEOUT = 60
+# matches counted per filtered facet request, bounding the scan on a miss
+FACET_SCAN_LIMIT = 500
+# the facet cron recounts in chained tasks of FACET_RECOUNT_BATCH_SIZE
+# conferences; a recount older than FACET_RECOUNT_TIMEOUT is presumed stuck
+FACET_RECOUNT_TASK_URL = '/tasks/recount_facets'
+FACET_RECOUNT_ID = "conferenceFacets"
+FACET_RECOUNT_BATCH_SIZE = 500
+FACET_RECOUNT_TIMEOUT = timedelta(hours=1)
+
 SESSION_FIELDS =    {
             'TYPE': 'typeOfSession',
             'TIME': 'startTime',
+            'START': 'startDateTime',
+            'END': 'endDateTime',
+            }
+
+SEARCH_SESSION_FIELDS = {
+            'TYPE': 'typeOfSession',
+            'DATE': 'date',
+            'TIME': 'startTime',
+            'START': 'startDateTime',
+            'END': 'endDateTime',
+            }
+
+# conference filter fields mapped to their denormalized Session properties
+SEARCH_CONFERENCE_FIELDS = {
+            'CITY': 'conferenceCity',
+            'TOPIC': 'conferenceTopics',
+            'MONTH': 'conferenceMonth',
             }
 
+# searchSessions combinations backed by index.yaml: equality filters alone
+# (merge-joined), or an inequality on one SEARCH_RANGE_FIELDS property plus
+# equality on at most one SEARCH_RANGE_PARTNERS property
+SEARCH_RANGE_FIELDS = ('typeOfSession', 'date', 'startTime', 'startDateTime',
+                       'endDateTime', 'conferenceMonth')
+SEARCH_RANGE_PARTNERS = ('typeOfSession', 'conferenceCity', 'conferenceTopics')
+
+MAX_SEARCH_RESULTS = 100
+MAX_BATCH_KEYS = 100
+
+# delta sync: changes returned per call and the lag allowed for
+# in-flight commits and index updates when handing out a new watermark
+SYNC_PAGE_SIZE = 200
+SYNC_SAFETY_MARGIN = 10
+WATERMARK_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+# deleteConference: cleanup runs as chained tasks, one batch per task,
+# through these phases in order
+DELETE_TASK_URL = '/tasks/delete_conference'
+DELETE_BATCH_SIZE = 100
+DELETE_PHASES = ('attendees', 'wishlists', 'speakers', 'waitlist', 'sessions')
+
 CONF_GET_REQUEST = endpoints.ResourceContainer(
     message_types.VoidMessage,
     websafeConferenceKey=messages.StringField(1),
@@ -96,9 +214,23 @@ SESSION_CONTAINER = endpoints.ResourceContainer(
     websafeConferenceKey=messages.StringField(1),
 )
 
+RELATED_REQUEST = endpoints.ResourceContainer(
+    message_types.VoidMessage,
+    websafeConferenceKey=messages.StringField(1),
+    matchCity=messages.BooleanField(2),
+    matchMonth=messages.BooleanField(3),
+    maxResults=messages.IntegerField(4),
+)
+
+SYNC_REQUEST = endpoints.ResourceContainer(
+    message_types.VoidMessage,
+    watermark=messages.StringField(1),
+)
+
 WISHLIST_REQUEST = endpoints.ResourceContainer(
     message_types.VoidMessage,
     websafeSessionKey=messages.StringField(1),
+    checkConflicts=messages.BooleanField(2),
 )
 
 SESSION_REQUEST = endpoints.ResourceContainer(
@@ -119,18 +251,34 @@ class ConferenceApi(remote.Service):
 
 # - - - Conference objects - - - - - - - - - - - - - - - - -
 
+    @staticmethod
+    def _conferenceCopyPlan():
+        """Return (field name, conversion) pairs for copying a Conference to
+        a ConferenceForm; built once per instance.
+        """
+        global _CONFERENCE_COPY_PLAN
+        if _CONFERENCE_COPY_PLAN is None:
+            plan = []
+            for field in ConferenceForm.all_fields():
+                if hasattr(Conference, field.name):
+                    # convert Date to date string; just copy others
+                    plan.append((field.name,
+                        'date' if field.name.endswith('Date') else 'copy'))
+                elif field.name == "websafeKey":
+                    plan.append((field.name, 'key'))
+            _CONFERENCE_COPY_PLAN = plan
+        return _CONFERENCE_COPY_PLAN
+
     def _copyConferenceToForm(self, conf, displayName):
         """Copy relevant fields from Conference to ConferenceForm."""
         cf = ConferenceForm()
-        for field in cf.all_fields():
-            if hasattr(conf, field.name):
-                # convert Date to date string; just copy others
-                if field.name.endswith('Date'):
-                    setattr(cf, field.name, str(getattr(conf, field.name)))
-                else:
-                    setattr(cf, field.name, getattr(conf, field.name))
-            elif field.name == "websafeKey":
-                setattr(cf, field.name, conf.key.urlsafe())
+        for name, conversion in self._conferenceCopyPlan():
+            if conversion == 'date':
+                setattr(cf, name, str(getattr(conf, name)))
+            elif conversion == 'copy':
+                setattr(cf, name, getattr(conf, name))
+            else:
+                setattr(cf, name, conf.key.urlsafe())
         if displayName:
             setattr(cf, 'organizerDisplayName', displayName)
         cf.check_initialized()
@@ -182,14 +330,14 @@ class ConferenceApi(remote.Service):
         c_key = ndb.Key(Conference, c_id, parent=p_key)
         data['key'] = c_key
         data['organizerUserId'] = request.organizerUserId = user_id
+        data['docId'] = related.allocateDocId(c_key, data['startDate'])
 
         # create Conference, send email to organizer confirming
         # creation of Conference & return (modified) ConferenceForm
         Conference(**data).put()
-        taskqueue.add(params={'email': user.email(),
-            'conferenceInfo': repr(request)},
-            url='/tasks/send_confirmation_email'
-        )
+        self._countConferenceFacets(data, 1)
+        related.indexConference(data['docId'], data['topics'])
+        notifications.queueConferenceCreated(user.email(), c_key)
 
         return request
 
@@ -242,6 +390,170 @@ class ConferenceApi(remote.Service):
             formatted_filters.append(filtr)
         return (inequality_field, formatted_filters)
 
+
+    @staticmethod
+    def _fetchEntities(query, **kwargs):
+        """Run query keys-only and resolve entities through the ndb cache."""
+        # keys-only queries are cheap small ops; get_multi then hits the
+        # in-context cache and memcache before falling back to Datastore
+        keys = query.fetch(keys_only=True, **kwargs)
+        # drop keys whose entities were deleted since the index was read
+        return [ent for ent in ndb.get_multi(keys) if ent is not None]
+
+    @staticmethod
+    def _facetValues(conf):
+        """Return {facet field: [values]} of a Conference or its data dict."""
+        get = conf.get if isinstance(conf, dict) else \
+            lambda name: getattr(conf, name)
+        values = {}
+        for field in FACET_FIELDS.values():
+            value = get(field)
+            if field == 'month' and not value:
+                continue
+            values[field] = value if isinstance(value, list) else [value]
+        return values
+
+    @staticmethod
+    def _countConferenceFacets(conf, delta):
+        """Add delta to the facet counters of a Conference."""
+        for field, values in ConferenceApi._facetValues(conf).items():
+            for value in set(values):
+                if value is not None:
+                    counters.increment(FACET_COUNTER_GROUP % field, value, delta)
+
+    @staticmethod
+    def _queueFacetRecount(websafeCursor=None):
+        """Queue the next batch of the facet recount."""
+        taskqueue.add(params={'cursor': websafeCursor or ''},
+                      url=FACET_RECOUNT_TASK_URL,
+                      transactional=ndb.in_transaction())
+
+    @staticmethod
+    def _reconcileFacets():
+        """Start recounting conference facets from Datastore unless a
+        recount is running; used by facet cron job to correct any drift in
+        the incremental counters.
+        """
+        @ndb.transactional
+        def _start():
+            recount = FacetRecount.get_by_id(FACET_RECOUNT_ID)
+            if recount and \
+                    datetime.utcnow() - recount.started < FACET_RECOUNT_TIMEOUT:
+                return
+            FacetRecount(id=FACET_RECOUNT_ID, totals={}).put()
+            ConferenceApi._queueFacetRecount()
+        _start()
+
+    @staticmethod
+    def _recountFacets(websafeCursor=None):
+        """Count one batch of conferences into the running facet recount
+        and chain the next; once all are counted, correct the counters by
+        the difference. Used by the recount task queued by the facet cron.
+        """
+        recount = FacetRecount.get_by_id(FACET_RECOUNT_ID)
+        if not recount:
+            return
+        if not recount.done:
+            # drop duplicate and superseded (stale cursor) tasks
+            if (recount.cursor or '') != (websafeCursor or ''):
+                return
+            cursor = Cursor(urlsafe=websafeCursor) if websafeCursor else None
+            confs, cursor, more = Conference.query().fetch_page(
+                FACET_RECOUNT_BATCH_SIZE, start_cursor=cursor)
+            counts = {}
+            for conf in confs:
+                for field, values in ConferenceApi._facetValues(conf).items():
+                    for value in set(values):
+                        if value is not None:
+                            key = (field, unicode(value))
+                            counts[key] = counts.get(key, 0) + 1
+
+            # totals and cursor advance together, so a retried batch is
+            # counted once
+            @ndb.transactional
+            def _checkpoint():
+                recount = FacetRecount.get_by_id(FACET_RECOUNT_ID)
+                if not recount or \
+                        (recount.cursor or '') != (websafeCursor or ''):
+                    return None
+                for (field, value), count in counts.items():
+                    fieldTotals = recount.totals.setdefault(field, {})
+                    fieldTotals[value] = fieldTotals.get(value, 0) + count
+                if more and cursor:
+                    recount.cursor = cursor.urlsafe()
+                    ConferenceApi._queueFacetRecount(recount.cursor)
+                else:
+                    recount.done = True
+                recount.put()
+                return recount
+            recount = _checkpoint()
+            if not recount or not recount.done:
+                return
+
+        # apply the difference rather than replacing the shards, so
+        # increments made meanwhile are kept; recomputing it on a retry
+        # makes this step safe to repeat
+        for field in FACET_FIELDS.values():
+            totals = recount.totals.get(field, {})
+            live = counters.groupCounts(FACET_COUNTER_GROUP % field,
+                                        cached=False)
+            for value in set(totals) | set(live):
+                delta = totals.get(value, 0) - live.get(value, 0)
+                if delta:
+                    counters.increment(FACET_COUNTER_GROUP % field, value,
+                                       delta)
+        recount.key.delete()
+
+    def _facetForms(self, countsByField):
+        """Build FacetForms from {facet field: {value: count}}."""
+        items = []
+        for name in sorted(FACET_FIELDS):
+            counts = countsByField.get(FACET_FIELDS[name], {})
+            items.append(FacetForm(field=name, counts=[
+                FacetCount(value=unicode(value), count=count)
+                for value, count in sorted(counts.items(),
+                                           key=lambda vc: (-vc[1], vc[0]))
+                if count > 0]))
+        return FacetForms(items=items)
+
+    @endpoints.method(ConferenceQueryForms, FacetForms,
+            path='getConferenceFacets',
+            http_method='POST',
+            name='getConferenceFacets')
+    def getConferenceFacets(self, request):
+        """Return conference counts per city, topic and month, narrowed by
+        the submitted filters if any.
+        """
+        if not request.filters:
+            return self._facetForms(dict(
+                (field, counters.groupCounts(FACET_COUNTER_GROUP % field))
+                for field in FACET_FIELDS.values()))
+
+        # narrowed counts depend on the filters; share them briefly across
+        # users with the same filter panel state
+        cache_key = MEMCACHE_FACETS_KEY % hashlib.md5(
+            repr([(f.field, f.operator, f.value) for f in request.filters])
+        ).hexdigest()
+        cached = memcache.get(cache_key)
+        if cached is None:
+            # count at most FACET_SCAN_LIMIT matches, resolved through the
+            # ndb entity cache; the extra key only detects truncation
+            keys = self._getQuery(request).fetch(
+                FACET_SCAN_LIMIT + 1, keys_only=True)
+            totals = dict((field, {}) for field in FACET_FIELDS.values())
+            for conf in ndb.get_multi(keys[:FACET_SCAN_LIMIT]):
+                if conf is None:
+                    continue
+                for field, values in self._facetValues(conf).items():
+                    for value in set(values):
+                        totals[field][value] = totals[field].get(value, 0) + 1
+            cached = (totals, len(keys) > FACET_SCAN_LIMIT)
+            memcache.set(cache_key, cached, MEMCACHE_FACETS_TIMEOUT)
+        totals, truncated = cached
+        form = self._facetForms(totals)
+        form.truncated = truncated
+        return form
+
     @endpoints.method(ConferenceForm, ConferenceForm, path='conference',
             http_method='POST', name='createConference')
     def createConference(self, request):
@@ -254,8 +566,8 @@ class ConferenceApi(remote.Service):
             name='queryConferences')
     def queryConferences(self, request):
         """Query for conferences."""
-        conferences = self._getQuery(request)
-    
+        conferences = self._fetchEntities(self._getQuery(request))
+
          # for every conference in Conference Kind, copy the properties into 
          # conferene form and store all forms into ConferenceForms
         return ConferenceForms(
@@ -277,6 +589,49 @@ class ConferenceApi(remote.Service):
         # return ConferenceForm
         return self._copyConferenceToForm(conf, getattr(prof, 'displayName'))
 
+    @staticmethod
+    def _getEntitiesByWebsafeKeys(websafeKeys, kind):
+        """Return {websafe key: entity or None} for websafe keys of a kind,
+        fetched with a single deduplicated get_multi.
+        """
+        if len(websafeKeys) > MAX_BATCH_KEYS:
+            raise endpoints.BadRequestException(
+                'At most %d keys may be requested at once.' % MAX_BATCH_KEYS)
+        keys = {}
+        for wsk in set(websafeKeys):
+            try:
+                key = ndb.Key(urlsafe=wsk)
+            except Exception:
+                continue
+            # keys of another kind are reported as not found
+            if key.kind() == kind._get_kind():
+                keys[wsk] = key
+        entities = dict(zip(keys.keys(), ndb.get_multi(keys.values())))
+        return dict((wsk, entities.get(wsk)) for wsk in websafeKeys)
+
+    @endpoints.method(WebsafeKeysForm, ConferenceLookupForms,
+            path='getConferences',
+            http_method='POST', name='getConferences')
+    def getConferences(self, request):
+        """Return requested conferences (by websafe keys), in request order."""
+        confs = self._getEntitiesByWebsafeKeys(request.websafeKeys, Conference)
+
+        # fetch each organizer profile once for all of their conferences
+        p_keys = list(set(conf.key.parent()
+                          for conf in confs.values() if conf))
+        names = dict((p_key, getattr(prof, 'displayName', None))
+                     for p_key, prof in zip(p_keys, ndb.get_multi(p_keys)))
+
+        items = []
+        for wsck in request.websafeKeys:
+            conf = confs[wsck]
+            items.append(ConferenceLookupForm(
+                websafeKey=wsck,
+                found=conf is not None,
+                conference=conf and self._copyConferenceToForm(
+                    conf, names.get(conf.key.parent()))))
+        return ConferenceLookupForms(items=items)
+
     @endpoints.method(message_types.VoidMessage, ConferenceForms, 
             path= 'getConferencesCreated',
             http_method='POST',
@@ -291,10 +646,12 @@ class ConferenceApi(remote.Service):
         user_id = getUserId(user)
         # Create an instance of a Key for an id(user email) of a kind(Profile) 
         p_key = ndb.Key(Profile, user_id)
+        # get the user profile while the ancestor query runs
+        prof_future = p_key.get_async()
         # query conferences with ancestor user
-        conferences = Conference.query(ancestor=p_key)
+        conferences = self._fetchEntities(Conference.query(ancestor=p_key))
         # get the user profile and display name
-        prof = p_key.get()
+        prof = prof_future.get_result()
         displayName = getattr(prof, 'displayName')
         # return set of ConferenceForm objects per Conference
         return ConferenceForms(
@@ -320,9 +677,10 @@ class ConferenceApi(remote.Service):
 
         conferences = ndb.get_multi(conferenceKeys)
 
-        # return set of ConferenceForm objects per Conference
+        # return set of ConferenceForm objects per Conference; skip deleted
+        # conferences whose references are still being cleaned up
         return ConferenceForms(items=[self._copyConferenceToForm(conf, "")\
-         for conf in conferences]
+         for conf in conferences if conf is not None]
         )
 
     @endpoints.method(message_types.VoidMessage, ConferenceForms,
@@ -355,8 +713,169 @@ class ConferenceApi(remote.Service):
             items=[self._copyConferenceToForm(conf, "") for conf in q]
         )
 
+    @endpoints.method(RELATED_REQUEST, ConferenceForms,
+            path='conference/{websafeConferenceKey}/related',
+            http_method='GET', name='getRelatedConferences')
+    def getRelatedConferences(self, request):
+        """Return upcoming conferences ranked by topics shared with the
+        given conference, optionally favouring its city and month.
+        """
+        wsck = request.websafeConferenceKey
+        conf = ndb.Key(urlsafe=wsck).get()
+        if not conf:
+            raise endpoints.NotFoundException(
+                'No conference found with key: %s' % wsck)
+
+        today = datetime.utcnow().date()
+        candidates = related.overlapCandidates(
+            conf.docId, conf.topics, RELATED_CANDIDATES, since=today)
+        others = ndb.get_multi([c_key for c_key, count in candidates])
+        ranked = []
+        for other, (c_key, count) in zip(others, candidates):
+            # only upcoming conferences are worth recommending
+            if not other or (other.startDate and other.startDate < today):
+                continue
+            score = count
+            if request.matchCity and other.city == conf.city:
+                score += RELATED_CITY_BONUS
+            if request.matchMonth and other.month and \
+                    other.month == conf.month:
+                score += RELATED_MONTH_BONUS
+            ranked.append((score, other))
+        ranked.sort(key=lambda so: -so[0])
+
+        limit = request.maxResults or RELATED_DEFAULT_LIMIT
+        return ConferenceForms(
+            items=[self._copyConferenceToForm(other, "")
+                   for score, other in ranked[:limit]]
+        )
+
+# - - - Deletion - - - - - - - - - - - - - - - - - - - - - -
+
+    @staticmethod
+    def _queueConferenceCleanup(websafeConferenceKey, phase, websafeCursor=None):
+        """Queue the next cleanup batch of a deleted Conference."""
+        taskqueue.add(params={'websafeConferenceKey': websafeConferenceKey,
+                              'phase': phase,
+                              'cursor': websafeCursor or ''},
+                      url=DELETE_TASK_URL,
+                      transactional=ndb.in_transaction())
+
+    @staticmethod
+    def _cleanupQuery(c_key, phase):
+        """Return query of what a cleanup phase removes or rewrites."""
+        if phase == 'attendees':
+            return Profile.query(
+                Profile.conferenceKeysToAttend == c_key.urlsafe())
+        if phase == 'waitlist':
+            return WaitlistEntry.query(WaitlistEntry.conference == c_key)
+        if phase == 'sessions':
+            return Session.query(ancestor=c_key)
+        # Session keys of a Conference are its descendants, which sort
+        # after its key and before the key of the next Conference id
+        low = c_key
+        high = ndb.Key(Conference, c_key.id() + 1, parent=c_key.parent())
+        prop = Profile.sessionsInWishlist if phase == 'wishlists' \
+            else Profile.speakerOfSessions
+        return Profile.query(prop > low, prop < high)
+
+    @staticmethod
+    def _cleanupConference(websafeConferenceKey, phase, websafeCursor=None):
+        """Remove one batch of a deleted Conference's Sessions, waitlist
+        entries or Profile references to it, then chain the next batch;
+        used by the cleanup task queued by deleteConference.
+        """
+        c_key = ndb.Key(urlsafe=websafeConferenceKey)
+        q = ConferenceApi._cleanupQuery(c_key, phase)
+        cursor = Cursor(urlsafe=websafeCursor) if websafeCursor else None
+
+        if phase in ('waitlist', 'sessions'):
+            keys, cursor, more = q.fetch_page(
+                DELETE_BATCH_SIZE, start_cursor=cursor, keys_only=True)
+            if phase == 'sessions':
+                ConferenceApi._recordDeletions(keys)
+            ndb.delete_multi(keys)
+        else:
+            profs, cursor, more = q.fetch_page(
+                DELETE_BATCH_SIZE, start_cursor=cursor)
+            # drop every reference at once so later phases skip this Profile
+            for prof in profs:
+                prof.conferenceKeysToAttend = [
+                    wsck for wsck in prof.conferenceKeysToAttend
+                    if wsck != websafeConferenceKey]
+                prof.sessionsInWishlist = [
+                    key for key in prof.sessionsInWishlist
+                    if key.parent() != c_key]
+                prof.speakerOfSessions = [
+                    key for key in prof.speakerOfSessions
+                    if key.parent() != c_key]
+            ndb.put_multi(profs)
+
+        if more and cursor:
+            ConferenceApi._queueConferenceCleanup(
+                websafeConferenceKey, phase, cursor.urlsafe())
+        elif phase != DELETE_PHASES[-1]:
+            ConferenceApi._queueConferenceCleanup(
+                websafeConferenceKey,
+                DELETE_PHASES[DELETE_PHASES.index(phase) + 1])
+
+    @endpoints.method(CONF_GET_REQUEST, BooleanMessage,
+            path='deleteConference/{websafeConferenceKey}',
+            http_method='DELETE', name='deleteConference')
+    def deleteConference(self, request):
+        """Delete conference (by websafeConferenceKey); open to its organizer.
+        Sessions and profile references are removed in the background.
+        """
+        user = endpoints.get_current_user()
+        if not user:
+            raise endpoints.UnauthorizedException('Authorization required')
+        user_id = getUserId(user)
+
+        wsck = request.websafeConferenceKey
+        try:
+            c_key = ndb.Key(urlsafe=wsck)
+        except Exception:
+            raise endpoints.BadRequestException(
+                'Invalid websafeConferenceKey: %s' % wsck)
+        conf = c_key.get()
+        if not conf:
+            raise endpoints.NotFoundException(
+                'No conference found with key: %s' % wsck)
+        if user_id != conf.organizerUserId:
+            raise endpoints.ForbiddenException(
+                'Only the owner can delete the conference.')
+
+        # the conference disappears and is tombstoned for sync clients
+        # right away; cleanup is only queued if the delete commits
+        @ndb.transactional(xg=True)
+        def _delete():
+            # a concurrent delete may have won since the read above
+            if not c_key.get():
+                return False
+            c_key.delete()
+            self._recordDeletions([c_key])
+            self._queueConferenceCleanup(wsck, DELETE_PHASES[0])
+            return True
+        if not _delete():
+            raise endpoints.NotFoundException(
+                'No conference found with key: %s' % wsck)
+
+        self._countConferenceFacets(conf, -1)
+        if conf.docId is not None:
+            related.unindexConference(conf.docId, conf.topics)
+        memcache.delete(MEMCACHE_SEATS_KEY % wsck)
+        return BooleanMessage(data=True)
+
 # - - - Registration - - - - - - - - - - - - - - - - - - - -
 
+    def _admit(self, endpoint, wsck):
+        """Apply admission control to a write endpoint before any Datastore
+        work; raises RateLimitedException when over the rate limits.
+        """
+        user = endpoints.get_current_user()
+        admission.admit(endpoint, conference=wsck,
+                        user=getUserId(user) if user else None)
+
     # conference registration needs to use transactions to guarantee that a user 
     # is not fasely registered for a full conference
     @ndb.transactional(xg=True)
@@ -383,7 +902,7 @@ class ConferenceApi(remote.Service):
             # check if seats avail
             if conf.seatsAvailable <= 0:
                 raise ConflictException(
-                    "There are no seats available.")
+                    "There are no seats available; join the waitlist instead.")
 
             # register user, take away one seat
             prof.conferenceKeysToAttend.append(wsck)
@@ -413,14 +932,254 @@ class ConferenceApi(remote.Service):
             http_method='POST', name='registerForConference')
     def registerForConference(self, request):
         """Register user for selected conference."""
-        return self._conferenceRegistration(request)
+        self._admit('registerForConference', request.websafeConferenceKey)
+        retval = self._conferenceRegistration(request)
+        # transaction has committed; adjust the cached count atomically
+        if retval.data:
+            memcache.decr(MEMCACHE_SEATS_KEY % request.websafeConferenceKey)
+            counters.increment(TRENDING_COUNTER_GROUP,
+                               request.websafeConferenceKey)
+        return retval
 
     @endpoints.method(CONF_GET_REQUEST, BooleanMessage,
             path='conference/{websafeConferenceKey}',
             http_method='DELETE', name='unregisterFromConference')
     def unregisterFromConference(self, request):
-        """Register user for selected conference."""
-        return self._conferenceRegistration(request, reg=false)
+        """Unregister user from selected conference."""
+        self._admit('unregisterFromConference', request.websafeConferenceKey)
+        retval = self._conferenceRegistration(request, reg=False)
+        # transaction has committed; adjust the cached count atomically
+        # and hand the freed seat to the head of the waitlist
+        if retval.data:
+            memcache.incr(MEMCACHE_SEATS_KEY % request.websafeConferenceKey)
+            counters.increment(TRENDING_COUNTER_GROUP,
+                               request.websafeConferenceKey, -1)
+            taskqueue.add(params={'websafeConferenceKey':
+                                  request.websafeConferenceKey},
+                          url='/tasks/promote_waitlist')
+        return retval
+
+# - - - Trending - - - - - - - - - - - - - - - - - - - - - -
+
+    @staticmethod
+    def _foldTrending():
+        """Fold pending registration counts into the decayed leaderboard;
+        used by trending cron job.
+        """
+        # consume the pending events; new ones keep accumulating meanwhile
+        events = counters.drain(TRENDING_COUNTER_GROUP)
+        board = Leaderboard.get_or_insert(TRENDING_LEADERBOARD_ID)
+        now = datetime.utcnow()
+
+        # decay existing scores by the time since the last fold
+        decay = 1.0
+        if board.updated:
+            elapsed = (now - board.updated).total_seconds()
+            decay = 0.5 ** (elapsed / TRENDING_HALF_LIFE)
+        scores = dict((wsck, score * decay) for wsck, score in board.scores)
+        for wsck, count in events.items():
+            scores[wsck] = scores.get(wsck, 0) + count
+
+        board.scores = [[wsck, score] for wsck, score in heapq.nlargest(
+            TRENDING_CAPACITY, scores.items(), key=lambda ws: ws[1])
+            if score > 0]
+        board.updated = now
+        board.put()
+        memcache.set(MEMCACHE_TRENDING_KEY, board.scores)
+
+    @staticmethod
+    def _trendingScores():
+        """Return [[websafeConferenceKey, score]] of the leaderboard, best
+        first, from memcache when cached.
+        """
+        scores = memcache.get(MEMCACHE_TRENDING_KEY)
+        if scores is None:
+            board = Leaderboard.get_by_id(TRENDING_LEADERBOARD_ID)
+            scores = board.scores if board else []
+            memcache.set(MEMCACHE_TRENDING_KEY, scores)
+        return scores
+
+    @endpoints.method(message_types.VoidMessage, ConferenceForms,
+            path='getTrendingConferences',
+            http_method='GET', name='getTrendingConferences')
+    def getTrendingConferences(self, request):
+        """Return the currently most popular conferences."""
+        keys = [ndb.Key(urlsafe=wsck) for wsck, score in
+                self._trendingScores()[:TRENDING_DEFAULT_LIMIT]]
+        return ConferenceForms(
+            items=[self._copyConferenceToForm(conf, "")
+                   for conf in ndb.get_multi(keys) if conf is not None]
+        )
+
+# - - - Waitlist - - - - - - - - - - - - - - - - - - - - - -
+
+    @staticmethod
+    def _waitlistKey(wsck, user_id):
+        """Return WaitlistEntry key of a user for a conference."""
+        return ndb.Key(WaitlistEntry, '%s|%s' % (wsck, user_id))
+
+    @staticmethod
+    def _waitlistPosition(entry):
+        """Return 1-based FIFO position of a WaitlistEntry."""
+        return WaitlistEntry.query(
+            WaitlistEntry.conference == entry.conference,
+            WaitlistEntry.created < entry.created
+        ).count() + 1
+
+    @staticmethod
+    @ndb.transactional(xg=True)
+    def _promoteWaitlistEntry(e_key):
+        """Register a waiting user if a seat is free; return True if the
+        entry was consumed (registered or stale), False if no seat is left.
+        """
+        entry = e_key.get()
+        if not entry:
+            return True
+        conf, prof = ndb.get_multi(
+            [entry.conference, ndb.Key(Profile, entry.userId)])
+        if not conf or not prof:
+            entry.key.delete()
+            return True
+        wsck = conf.key.urlsafe()
+        if wsck in prof.conferenceKeysToAttend:
+            entry.key.delete()
+            return True
+        if conf.seatsAvailable <= 0:
+            return False
+
+        # register user, take away one seat
+        prof.conferenceKeysToAttend.append(wsck)
+        conf.seatsAvailable -= 1
+        ndb.put_multi([prof, conf])
+        entry.key.delete()
+        def onCommit():
+            memcache.decr(MEMCACHE_SEATS_KEY % wsck)
+            counters.increment(TRENDING_COUNTER_GROUP, wsck)
+        ndb.get_context().call_on_commit(onCommit)
+        return True
+
+    @staticmethod
+    def _promoteWaitlist(websafeConferenceKey):
+        """Promote waiters in FIFO order while seats are available; used by
+        the promotion task queued when a seat is freed.
+        """
+        c_key = ndb.Key(urlsafe=websafeConferenceKey)
+        e_keys = WaitlistEntry.query(WaitlistEntry.conference == c_key) \
+            .order(WaitlistEntry.created) \
+            .fetch(WAITLIST_PROMOTE_BATCH, keys_only=True)
+        for e_key in e_keys:
+            if not ConferenceApi._promoteWaitlistEntry(e_key):
+                return
+        # a full batch was consumed; there may be more seats and waiters
+        if len(e_keys) == WAITLIST_PROMOTE_BATCH:
+            taskqueue.add(params={'websafeConferenceKey': websafeConferenceKey},
+                          url='/tasks/promote_waitlist')
+
+    @endpoints.method(CONF_GET_REQUEST, WaitlistForm,
+            path='conference/{websafeConferenceKey}/waitlist',
+            http_method='POST', name='joinWaitlist')
+    def joinWaitlist(self, request):
+        """Join the waitlist of a sold out conference."""
+        self._admit('joinWaitlist', request.websafeConferenceKey)
+        prof = self._getProfileFromUser() # get user Profile
+        wsck = request.websafeConferenceKey
+        conf = ndb.Key(urlsafe=wsck).get()
+        if not conf:
+            raise endpoints.NotFoundException(
+                'No conference found with key: %s' % wsck)
+        if wsck in prof.conferenceKeysToAttend:
+            raise ConflictException(
+                "You have already registered for this conference")
+        if conf.seatsAvailable > 0:
+            raise ConflictException(
+                "There are seats available; register instead.")
+
+        # joining again keeps the original place in the queue
+        e_key = self._waitlistKey(wsck, prof.key.id())
+        entry = e_key.get()
+        if not entry:
+            entry = WaitlistEntry(key=e_key, conference=conf.key,
+                                  userId=prof.key.id())
+            entry.put()
+        return WaitlistForm(websafeConferenceKey=wsck,
+                            position=self._waitlistPosition(entry))
+
+    @endpoints.method(CONF_GET_REQUEST, WaitlistForm,
+            path='conference/{websafeConferenceKey}/waitlist',
+            http_method='GET', name='getWaitlistPosition')
+    def getWaitlistPosition(self, request):
+        """Return user's position on the waitlist of a conference."""
+        prof = self._getProfileFromUser() # get user Profile
+        wsck = request.websafeConferenceKey
+        entry = self._waitlistKey(wsck, prof.key.id()).get()
+        if not entry:
+            raise endpoints.NotFoundException(
+                'You are not on the waitlist for: %s' % wsck)
+        return WaitlistForm(websafeConferenceKey=wsck,
+                            position=self._waitlistPosition(entry))
+
+    @endpoints.method(CONF_GET_REQUEST, BooleanMessage,
+            path='conference/{websafeConferenceKey}/waitlist',
+            http_method='DELETE', name='leaveWaitlist')
+    def leaveWaitlist(self, request):
+        """Leave the waitlist of a conference."""
+        prof = self._getProfileFromUser() # get user Profile
+        e_key = self._waitlistKey(request.websafeConferenceKey, prof.key.id())
+        if not e_key.get():
+            return BooleanMessage(data=False)
+        e_key.delete()
+        return BooleanMessage(data=True)
+
+# - - - Seat availability - - - - - - - - - - - - - - - - - -
+
+    @staticmethod
+    def _warmup():
+        """Prime per-instance state and shared caches; used by the warmup
+        request so new instances serve their first calls warm.
+        """
+        ConferenceApi._conferenceCopyPlan()
+        if memcache.get(MEMCACHE_ANNOUNCEMENTS_KEY) is None:
+            ConferenceApi._cacheAnnouncement()
+        ConferenceApi._getAnnouncement(MEMCACHE_ANNOUNCEMENTS_KEY)
+        ConferenceApi._getAnnouncement(MEMCACHE_SPEAKER_KEY)
+        # the few trending conferences are the hottest reads; seat counts
+        # are kept warm by the seats cron job, not by every new instance
+        ndb.get_multi([ndb.Key(urlsafe=wsck) for wsck, score in
+                       ConferenceApi._trendingScores()[:WARMUP_CONFERENCES]])
+
+    @staticmethod
+    def _reconcileSeats():
+        """Refresh cached seat counts of nearly sold out conferences from
+        Datastore; used by seats cron job to correct memcache drift.
+        """
+        confs = Conference.query(ndb.AND(
+            Conference.seatsAvailable <= HOT_SEATS_THRESHOLD,
+            Conference.seatsAvailable > 0)
+        ).order(Conference.seatsAvailable).fetch(
+            HOT_SEATS_LIMIT, projection=[Conference.seatsAvailable])
+        memcache.set_multi(
+            dict((conf.key.urlsafe(), conf.seatsAvailable) for conf in confs),
+            key_prefix=MEMCACHE_SEATS_KEY % '',
+            time=MEMCACHE_SEATS_TIMEOUT)
+
+    @endpoints.method(CONF_GET_REQUEST, SeatsAvailableForm,
+            path='conference/{websafeConferenceKey}/seats',
+            http_method='GET', name='getSeatsAvailable')
+    def getSeatsAvailable(self, request):
+        """Return seats available for a conference, served from memcache."""
+        wsck = request.websafeConferenceKey
+        seats = memcache.get(MEMCACHE_SEATS_KEY % wsck)
+        if seats is None:
+            conf = ndb.Key(urlsafe=wsck).get()
+            if not conf:
+                raise endpoints.NotFoundException(
+                    'No conference found with key: %s' % wsck)
+            seats = conf.seatsAvailable or 0
+            # add, not set, so a concurrent incr/decr is never overwritten
+            memcache.add(MEMCACHE_SEATS_KEY % wsck, seats,
+                         time=MEMCACHE_SEATS_TIMEOUT)
+        return SeatsAvailableForm(websafeConferenceKey=wsck,
+                                  seatsAvailable=int(seats))
 
 # - - - Profile objects - - - - - - - - - - - - - - - - - - -
 
@@ -500,8 +1259,106 @@ class ConferenceApi(remote.Service):
         """Update & return user profile."""
         return self._doProfile(request)
 
+# - - - Sync - - - - - - - - - - - - - - - - - - - - - - - -
+
+    @staticmethod
+    def _recordDeletions(keys):
+        """Write Tombstones for deleted entities so sync clients drop them."""
+        ndb.put_multi([Tombstone(websafeKey=key.urlsafe(), kind=key.kind())
+                       for key in keys])
+
+    @staticmethod
+    def _changedSince(model, since):
+        """Return (entities, truncated) of a kind changed since a datetime,
+        oldest change first, at most SYNC_PAGE_SIZE.
+        """
+        q = model.query(model.updated >= since).order(model.updated)
+        keys = q.fetch(SYNC_PAGE_SIZE + 1, keys_only=True)
+        entities = [e for e in ndb.get_multi(keys[:SYNC_PAGE_SIZE]) if e]
+        return entities, len(keys) > SYNC_PAGE_SIZE
+
+    @endpoints.method(SYNC_REQUEST, SyncForm,
+            path='sync',
+            http_method='GET', name='sync')
+    def sync(self, request):
+        """Return conferences, wishlist sessions and profile changed or
+        deleted since the client's watermark, plus a new watermark.
+        """
+        try:
+            since = datetime.strptime(request.watermark, WATERMARK_FORMAT) \
+                if request.watermark else datetime.min
+        except ValueError:
+            raise endpoints.BadRequestException(
+                'Invalid watermark: %s' % request.watermark)
+        # changes committed after this point are picked up next time
+        watermark = datetime.utcnow() - timedelta(seconds=SYNC_SAFETY_MARGIN)
+
+        confs, more = self._changedSince(Conference, since)
+        if more:
+            watermark = min(watermark, confs[-1].updated)
+        form = SyncForm(
+            conferences=[self._copyConferenceToForm(conf, "")
+                         for conf in confs])
+
+        user = endpoints.get_current_user()
+        if user:
+            prof = self._getProfileFromUser()
+            profileChanged = prof.updated is None or prof.updated >= since
+            if profileChanged:
+                form.profile = self._copyProfileToForm(prof)
+                form.conferenceKeysToAttend = prof.conferenceKeysToAttend
+                form.sessionsInWishlist = [
+                    key.urlsafe() for key in prof.sessionsInWishlist]
+            # only sessions in the wishlist are kept by the client: send
+            # all of them when the wishlist itself changed, else the ones
+            # that changed since the watermark
+            form.sessions = [
+                self._copySessionToForm(session)
+                for session in ndb.get_multi(prof.sessionsInWishlist)
+                if session and (profileChanged or session.updated is None or
+                                session.updated >= since)]
+
+        tombstones = Tombstone.query(Tombstone.deleted >= since) \
+            .order(Tombstone.deleted).fetch(SYNC_PAGE_SIZE + 1)
+        if len(tombstones) > SYNC_PAGE_SIZE:
+            tombstones = tombstones[:SYNC_PAGE_SIZE]
+            watermark = min(watermark, tombstones[-1].deleted)
+            more = True
+        form.deletedKeys = [t.websafeKey for t in tombstones]
+
+        # never move a client's watermark backwards
+        form.watermark = max(watermark, since).strftime(WATERMARK_FORMAT)
+        form.more = more
+        return form
+
 # - - - Announcements - - - - - - - - - - - - - - - - - - - -
 
+    @staticmethod
+    def _setAnnouncement(key, announcement):
+        """Store a versioned announcement in memcache and this instance."""
+        # versions come from one memcache counter, not instance clocks; if
+        # the counter is evicted it restarts from the current time in ms,
+        # which is still ahead of the versions it handed out
+        now = int(time.time() * 1000)
+        version = memcache.incr(MEMCACHE_VERSION_KEY % key,
+                                initial_value=now) or now
+        value = (version, announcement)
+        memcache.set(key, value)
+        ANNOUNCEMENT_CACHE.set(key, value)
+
+    @staticmethod
+    def _getAnnouncement(key):
+        """Return announcement from the instance cache, refilled from
+        memcache when stale.
+        """
+        def load():
+            value = memcache.get(key)
+            if isinstance(value, tuple):
+                return value
+            # unversioned value or no announcement
+            return (0, value or "")
+        return ANNOUNCEMENT_CACHE.get(key, load)[1]
+
     @staticmethod
     def _cacheAnnouncement():
         """Create Announcement & assign to memcache; used by
@@ -519,12 +1376,14 @@ class ConferenceApi(remote.Service):
                 'Last chance to attend! The following conferences '
                 'are nearly sold out:',
                 ', '.join(conf.name for conf in confs))
-            memcache.set(MEMCACHE_ANNOUNCEMENTS_KEY, announcement)
+            ConferenceApi._setAnnouncement(MEMCACHE_ANNOUNCEMENTS_KEY,
+                                           announcement)
         else:
             # If there are no sold out conferences,
-            # delete the memcache announcements entry
+            # store an empty announcement so instances see the change
             announcement = ""
-            memcache.delete(MEMCACHE_ANNOUNCEMENTS_KEY)
+            ConferenceApi._setAnnouncement(MEMCACHE_ANNOUNCEMENTS_KEY,
+                                           announcement)
 
         return announcement
 
@@ -534,11 +1393,9 @@ class ConferenceApi(remote.Service):
             http_method='GET', name='getAnnouncement')
     def getAnnouncement(self, request):
         """Return Announcement from memcache."""
-        # return an existing announcement from Memcache or an empty string.
-        announcement = memcache.get(MEMCACHE_ANNOUNCEMENTS_KEY)
-        if not announcement:
-            announcement = ""
-        return StringMessage(data=announcement)
+        # return an existing announcement from cache or an empty string.
+        return StringMessage(
+            data=self._getAnnouncement(MEMCACHE_ANNOUNCEMENTS_KEY))
 
     @staticmethod
     def _speakerAnnouncement(webSafeConferenceKey, webSafeSpeakerKey):
@@ -563,12 +1420,12 @@ class ConferenceApi(remote.Service):
             announcement = 'Featured Speaker: {} In Sessions: {}'.format(
                 speaker.displayName, 
                 ', '.join(session.name for session in sessions))
-            memcache.set(MEMCACHE_SPEAKER_KEY, announcement)
+            ConferenceApi._setAnnouncement(MEMCACHE_SPEAKER_KEY, announcement)
         else:
-            # If there are no sold out conferences,
-            # delete the memcache announcements entry
+            # If there are no sessions for the speaker,
+            # store an empty announcement so instances see the change
             announcement = ""
-            memcache.delete(MEMCACHE_SPEAKER_KEY)
+            ConferenceApi._setAnnouncement(MEMCACHE_SPEAKER_KEY, announcement)
 
         return announcement
 
@@ -577,11 +1434,8 @@ class ConferenceApi(remote.Service):
             http_method='GET', name='getSpeakerAnnouncement')
     def getSpeakerAnnouncement(self, request):
         """Return new speaker from memcache."""
-        # return an existing announcement from Memcache or an empty string.
-        announcement = memcache.get(MEMCACHE_SPEAKER_KEY)
-        if not announcement:
-            announcement = ""
-        return StringMessage(data=announcement)
+        # return an existing announcement from cache or an empty string.
+        return StringMessage(data=self._getAnnouncement(MEMCACHE_SPEAKER_KEY))
 
 
 # - - - Session objects - - - - - - - - - - - - - - - - -
@@ -634,6 +1488,7 @@ class ConferenceApi(remote.Service):
 
         s_key = ndb.Key(Session, s_id, parent=conf_key)
         data['key'] = s_key
+        data.update(self._conferenceFieldsForSession(conf))
 
         # Add Created Session to the list of Sessions the speaker is preseting in.
         speakerKey = ndb.Key(Profile, request.mainEmail)
@@ -682,10 +1537,25 @@ class ConferenceApi(remote.Service):
             http_method='POST', name='createSession')
     def createSession(self, request):
         """Create new session. Open to the organizer of the conference"""
+        self._admit('createSession', request.websafeConferenceKey)
         # make Session key from ID and parent conference key
         s_id = Session.allocate_ids(size=1, parent=ndb.Key(urlsafe=request.websafeConferenceKey))[0]
         return self._createSessionObject(request, s_id)
 
+    @endpoints.method(WebsafeKeysForm, SessionLookupForms,
+            path='getSessions',
+            http_method='POST', name='getSessions')
+    def getSessions(self, request):
+        """Return requested sessions (by websafe keys), in request order."""
+        sessions = self._getEntitiesByWebsafeKeys(request.websafeKeys, Session)
+        return SessionLookupForms(items=[
+            SessionLookupForm(
+                websafeKey=wssk,
+                found=sessions[wssk] is not None,
+                session=sessions[wssk] and
+                    self._copySessionToForm(sessions[wssk]))
+            for wssk in request.websafeKeys])
+
     @endpoints.method(SESSION_REQUEST, SessionForms,
             path='getConferenceSessions/{websafeConferenceKey}',
             http_method='GET',
@@ -695,8 +1565,8 @@ class ConferenceApi(remote.Service):
 
         c_key = ndb.Key(urlsafe=request.websafeConferenceKey)
         # Query for all Session that have an ancestor Conference
-        sessions = Session.query(ancestor=c_key)
-    
+        sessions = self._fetchEntities(Session.query(ancestor=c_key))
+
         return SessionForms(
             items=[self._copySessionToForm(session) for session in sessions]
         )
@@ -711,7 +1581,8 @@ class ConferenceApi(remote.Service):
         c_key = ndb.Key(urlsafe=request.websafeConferenceKey)
         sessions = Session.query(ancestor=c_key)
         sessions = sessions.filter(Session.typeOfSession == request.sessionType)
-    
+        sessions = self._fetchEntities(sessions)
+
         return SessionForms(
             items=[self._copySessionToForm(session) for session in sessions]
         )
@@ -738,9 +1609,9 @@ class ConferenceApi(remote.Service):
         # Issue a multi query for all sessionKeys contained by a Speaker
         sessions = ndb.get_multi(sessionKeys)
 
-        # copy results to SessionForms
+        # copy results to SessionForms, skipping deleted sessions
         return SessionForms(items=[self._copySessionToForm(session)\
-         for session in sessions]
+         for session in sessions if session is not None]
         )
 
     def _getSessionQuery(self, request):
@@ -748,48 +1619,125 @@ class ConferenceApi(remote.Service):
         q = Session.query()
         inequality_filter, filters = self._formatFilters(request.filters, SESSION_FIELDS)
 
-        # If exists, sort on inequality filter first
+        # If exists, sort on inequality filter first, else chronologically
         if not inequality_filter:
-            q = q.order(Session.name)
+            q = q.order(Session.startDateTime)
         else:
             q = q.order(ndb.GenericProperty(inequality_filter))
-            q = q.order(Session.name)
+        q = q.order(Session.name)
 
         for filtr in filters:
-            if filtr["field"] == "startTime":
-                testTime = datetime.strptime(filtr["value"], "%H:%M").time()
-                # filtr["value"] = datetime.strptime(filtr["value"], "%H:%M").time()
-                # formatted_query = ndb.query.FilterNode(Session.startTime._to_base_type, filtr["operator"], testTime)
-                if filtr["operator"] == '=':
-                    q = q.filter(Session.startTime == testTime)
-
-                elif filtr["operator"] == '>=':
-                    q = q.filter(Session.startTime >= testTime)
-
-                elif filtr["operator"] == '<=':
-                    q = q.filter(
-                        ndb.AND(Session.startTime <= testTime),
-                                (Session.startTime >= datetime.strptime("00:00", "%H:%M").time()))
-                else:
-                    raise endpoints.BadRequestException("Unsupported filter for time.")
-            else:
-                formatted_query = ndb.query.FilterNode(filtr["field"], filtr["operator"], filtr["value"])
-                q = q.filter(formatted_query)
+            q = q.filter(self._sessionFilter(filtr))
         return q
 
+    def _sessionFilter(self, filtr):
+        """Return filter node for a formatted Session filter, converting the
+        submitted string to the type stored by the property.
+        """
+        field, value = filtr["field"], filtr["value"]
+        try:
+            if field in ("startDateTime", "endDateTime"):
+                value = datetime.strptime(value, "%Y-%m-%d %H:%M")
+            elif field == "date":
+                value = datetime.strptime(value, "%Y-%m-%d").date()
+            elif field == "startTime":
+                value = datetime.strptime(value, "%H:%M").time()
+            elif field == "conferenceMonth":
+                value = int(value)
+        except (TypeError, ValueError):
+            raise endpoints.BadRequestException(
+                "Invalid value for filter on %s." % field)
+        return Session._properties[field]._comparison(filtr["operator"], value)
+
     @endpoints.method(SessionQueryForms, SessionForms,
             path='queryAllSessions',
             http_method='POST',
             name='queryAllSessions')
     def queryAllSessions(self, request):
         """Query for all session."""
-        sessions = self._getSessionQuery(request)
-    
+        sessions = self._fetchEntities(self._getSessionQuery(request))
+
         return SessionForms(
             items=[self._copySessionToForm(session) \
             for session in sessions]
         )
 
+    @staticmethod
+    def _conferenceFieldsForSession(conf):
+        """Return the Conference fields denormalized onto its Sessions."""
+        return {
+            'conferenceCity': conf.city,
+            'conferenceTopics': conf.topics,
+            'conferenceMonth': conf.month,
+        }
+
+    def _getSessionSearchQuery(self, request):
+        """Return Session query joining session and conference filters."""
+        q = Session.query()
+        inequality_filter, filters = self._formatFilters(
+            request.filters, SEARCH_SESSION_FIELDS)
+        conf_inequality, conf_filters = self._formatFilters(
+            request.conferenceFilters, SEARCH_CONFERENCE_FIELDS)
+
+        # session and conference predicates share one index scan, so the
+        # single inequality rule applies across both sets of filters
+        if inequality_filter and conf_inequality:
+            raise endpoints.BadRequestException(
+                "Inequality filter is allowed on only one field.")
+        inequality_filter = inequality_filter or conf_inequality
+
+        # != runs as a multi-query, which cannot be paged with cursors
+        if any(f["operator"] == "!=" for f in filters + conf_filters):
+            raise endpoints.BadRequestException(
+                "NE filters are not supported by searchSessions.")
+
+        # reject combinations that have no index rather than failing with
+        # NeedIndexError
+        if inequality_filter:
+            partners = set(f["field"] for f in filters + conf_filters
+                           if f["field"] != inequality_filter)
+            if inequality_filter not in SEARCH_RANGE_FIELDS or \
+                    len(partners) > 1 or \
+                    partners - set(SEARCH_RANGE_PARTNERS):
+                raise endpoints.BadRequestException(
+                    "Unsupported filter combination: a range filter on TYPE, "
+                    "DATE, TIME, START, END or MONTH combines with equality "
+                    "on at most one of TYPE, CITY or TOPIC.")
+
+        # If exists, sort on inequality filter first
+        if inequality_filter:
+            q = q.order(ndb.GenericProperty(inequality_filter))
+        q = q.order(Session.name)
+
+        for filtr in filters + conf_filters:
+            q = q.filter(self._sessionFilter(filtr))
+        return q
+
+    @endpoints.method(SessionSearchForm, SessionForms,
+            path='searchSessions',
+            http_method='POST',
+            name='searchSessions')
+    def searchSessions(self, request):
+        """Search sessions across conferences by session and conference fields."""
+        q = self._getSessionSearchQuery(request)
+        page_size = min(max(request.maxResults or 1, 1), MAX_SEARCH_RESULTS)
+        try:
+            cursor = Cursor(urlsafe=request.pageToken) \
+                if request.pageToken else None
+        except Exception:
+            raise endpoints.BadRequestException(
+                'Invalid pageToken: %s' % request.pageToken)
+
+        # keys-only page, then resolve entities through the ndb cache
+        keys, next_cursor, more = q.fetch_page(
+            page_size, start_cursor=cursor, keys_only=True)
+        sessions = [s for s in ndb.get_multi(keys) if s is not None]
+
+        return SessionForms(
+            items=[self._copySessionToForm(session) for session in sessions],
+            nextPageToken=next_cursor.urlsafe() if more and next_cursor else None
+        )
+
     @endpoints.method(message_types.VoidMessage, SessionForms,
             path='getProblematicQuery',
             http_method='GET',
@@ -820,12 +1768,14 @@ class ConferenceApi(remote.Service):
             http_method='POST', name='addSessionToWishlist')
     def addSessionToWishlist(self, request):
         """Add a session to user's wishlist."""
+        wssk = request.websafeSessionKey
+        sessionKey = ndb.Key(urlsafe=wssk)
+        self._admit('addSessionToWishlist', sessionKey.parent() and
+                    sessionKey.parent().urlsafe())
         prof = self._getProfileFromUser() # get user Profile
 
         # check if session exists given websafeSessionKey
         # get session; check that it exists
-        wssk = request.websafeSessionKey
-        sessionKey = ndb.Key(urlsafe=wssk)
         session = sessionKey.get()
         if not session:
             raise endpoints.NotFoundException(
@@ -835,11 +1785,29 @@ class ConferenceApi(remote.Service):
         if sessionKey in prof.sessionsInWishlist:
             raise ConflictException(
                 "Session is already in your wishlist")
-        # register user, take away one seat
-        prof.sessionsInWishlist.append(sessionKey)
-
-        # write things back to the datastore & return
-        prof.put()
+        if request.checkConflicts and session.startDateTime:
+            overlapping = [s.name for s in ndb.get_multi(prof.sessionsInWishlist)
+                           if s and s.startDateTime and
+                           s.startDateTime < session.endDateTime and
+                           session.startDateTime < s.endDateTime]
+            if overlapping:
+                raise ConflictException(
+                    "Session overlaps wishlisted sessions: %s" %
+                    ', '.join(overlapping))
+        # reading the conference in the transaction makes a racing
+        # deleteConference either abort this write or clean it up afterwards
+        p_key = prof.key
+
+        @ndb.transactional(xg=True)
+        def _add():
+            prof = p_key.get()
+            if not sessionKey.parent().get():
+                raise endpoints.NotFoundException(
+                    'Conference of session %s has been deleted' % wssk)
+            if sessionKey not in prof.sessionsInWishlist:
+                prof.sessionsInWishlist.append(sessionKey)
+                prof.put()
+        _add()
         return self._copySessionToForm(session)
 
     @endpoints.method(message_types.VoidMessage, SessionForms,
@@ -858,11 +1826,47 @@ class ConferenceApi(remote.Service):
 
         sessions = ndb.get_multi(sessionKeys)
 
-        # return set of ConferenceForm objects per Conference
+        # return set of SessionForm objects, skipping deleted sessions
         return SessionForms(items=[self._copySessionToForm(session)\
-         for session in sessions]
+         for session in sessions if session is not None]
         )
 
+    @staticmethod
+    def _sessionConflicts(sessions):
+        """Return [(start, end, sessions)] of the groups of sessions whose
+        [start, start + duration) intervals overlap, in start order.
+        """
+        # sort by start, then sweep keeping the end of the current group;
+        # a session starting before that end joins the group
+        timed = sorted((s for s in sessions if s and s.startDateTime),
+                       key=lambda s: (s.startDateTime, s.endDateTime))
+        groups = []
+        group, groupEnd = [], None
+        for session in timed:
+            if group and session.startDateTime < groupEnd:
+                group.append(session)
+                groupEnd = max(groupEnd, session.endDateTime)
+                continue
+            if len(group) > 1:
+                groups.append((group[0].startDateTime, groupEnd, group))
+            group, groupEnd = [session], session.endDateTime
+        if len(group) > 1:
+            groups.append((group[0].startDateTime, groupEnd, group))
+        return groups
+
+    @endpoints.method(message_types.VoidMessage, WishlistConflictForms,
+            path='getWishlistConflicts',
+            http_method='GET', name='getWishlistConflicts')
+    def getWishlistConflicts(self, request):
+        """Return groups of wishlisted sessions that overlap in time."""
+        prof = self._getProfileFromUser() # get user Profile
+        sessions = ndb.get_multi(prof.sessionsInWishlist)
+        return WishlistConflictForms(items=[
+            WishlistConflictForm(
+                start=str(start), end=str(end),
+                sessions=[self._copySessionToForm(s) for s in group])
+            for start, end, group in self._sessionConflicts(sessions)])
+
 
 # registers API
 api = endpoints.api_server([ConferenceApi]) 
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""counters.py
+
+Udacity conference server-side Python App Engine sharded counters; counts
+are grouped (e.g. one group per facet) and each named count is spread over
+NUM_SHARDS entities so concurrent increments do not contend
+
+"""
+
+import random
+
+from google.appengine.api import memcache
+from google.appengine.ext import ndb
+
+from models import CounterShard
+
+NUM_SHARDS = 20
+# summed group counts are cached this long rather than invalidated on
+# every increment, so they may lag writes by up to a minute
+MEMCACHE_COUNTS_PREFIX = "COUNTS:"
+MEMCACHE_COUNTS_TIMEOUT = 60
+# shards (each its own entity group) drained per cross-group transaction
+DRAIN_BATCH_SIZE = 25
+
+
+def _shardKey(group, name, index):
+    """Return key of one shard of a named count."""
+    return ndb.Key(CounterShard, '%s|%s|%d' % (group, name, index))
+
+
+@ndb.transactional
+def _incrementShard(key, group, name, delta):
+    """Add delta to a single shard, creating it if needed."""
+    shard = key.get()
+    if not shard:
+        shard = CounterShard(key=key, group=group, name=name)
+    shard.count += delta
+    shard.put()
+
+
+def increment(group, name, delta=1):
+    """Add delta to a named count on a randomly chosen shard."""
+    index = random.randint(0, NUM_SHARDS - 1)
+    _incrementShard(_shardKey(group, name, index), group, unicode(name), delta)
+
+
+def groupCounts(group, cached=True):
+    """Return {name: count} summed over the shards of a group."""
+    counts = memcache.get(MEMCACHE_COUNTS_PREFIX + group) if cached else None
+    if counts is None:
+        counts = {}
+        for shard in CounterShard.query(CounterShard.group == group):
+            counts[shard.name] = counts.get(shard.name, 0) + shard.count
+        memcache.set(MEMCACHE_COUNTS_PREFIX + group, counts,
+                     MEMCACHE_COUNTS_TIMEOUT)
+    return counts
+
+
+@ndb.transactional(xg=True)
+def _drainShards(keys):
+    """Delete shards, returning their [(name, count)]."""
+    shards = [shard for shard in ndb.get_multi(keys) if shard]
+    ndb.delete_multi([shard.key for shard in shards])
+    return [(shard.name, shard.count) for shard in shards]
+
+
+def drain(group):
+    """Return {name: count} summed over the shards of a group and delete
+    them; increments racing the drain start fresh shards and are kept.
+    """
+    keys = CounterShard.query(CounterShard.group == group).fetch(keys_only=True)
+    counts = {}
+    for i in range(0, len(keys), DRAIN_BATCH_SIZE):
+        for name, count in _drainShards(keys[i:i + DRAIN_BATCH_SIZE]):
+            counts[name] = counts.get(name, 0) + count
+    memcache.delete(MEMCACHE_COUNTS_PREFIX + group)
+    return counts
+
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+"""export.py
+
+Udacity conference server-side Python App Engine bulk export; reads
+Conference, Session and attendee data in cursor batches and serializes
+them as newline-delimited JSON or CSV with resumable continuation tokens
+
+"""
+
+import csv
+import json
+import time
+import StringIO
+
+from google.appengine.datastore.datastore_query import Cursor
+from google.appengine.ext import ndb
+
+from models import Conference
+from models import Profile
+from models import Session
+
+EXPORT_BATCH_SIZE = 200
+# rows per response before handing out a continuation
+EXPORT_MAX_ROWS = 10000
+# seconds of work per request, well inside the request deadline
+EXPORT_TIME_BUDGET = 30
+FORMATS = ('ndjson', 'csv')
+
+# - - - Export kinds - - - - - - - - - - - - - - - - - - - -
+
+def _conferenceQuery(websafeConferenceKey):
+    """Return Conference query for the export."""
+    return Conference.query()
+
+
+def _conferenceRows(conf, websafeConferenceKey):
+    """Yield the export row of a Conference."""
+    yield {
+        'websafeKey': conf.key.urlsafe(),
+        'name': conf.name,
+        'description': conf.description,
+        'organizerUserId': conf.organizerUserId,
+        'topics': conf.topics,
+        'city': conf.city,
+        'startDate': conf.startDate and str(conf.startDate),
+        'endDate': conf.endDate and str(conf.endDate),
+        'month': conf.month,
+        'maxAttendees': conf.maxAttendees,
+        'seatsAvailable': conf.seatsAvailable,
+    }
+
+
+def _sessionQuery(websafeConferenceKey):
+    """Return Session query, limited to one conference if given."""
+    if websafeConferenceKey:
+        return Session.query(ancestor=ndb.Key(urlsafe=websafeConferenceKey))
+    return Session.query()
+
+
+def _sessionRows(session, websafeConferenceKey):
+    """Yield the export row of a Session."""
+    yield {
+        'websafeKey': session.key.urlsafe(),
+        'websafeConferenceKey': session.key.parent().urlsafe(),
+        'name': session.name,
+        'highlights': session.highlights,
+        'mainEmail': session.mainEmail,
+        'duration': session.duration,
+        'typeOfSession': session.typeOfSession,
+        'date': session.date and str(session.date),
+        'startTime': session.startTime and str(session.startTime),
+    }
+
+
+def _attendeeQuery(websafeConferenceKey):
+    """Return Profile query for attendees, limited to one conference if given."""
+    if websafeConferenceKey:
+        return Profile.query(
+            Profile.conferenceKeysToAttend == websafeConferenceKey)
+    # all profiles in key order; an inequality on the repeated property
+    # would return a profile once per registration across cursor pages.
+    # _attendeeRows yields nothing for profiles without registrations
+    return Profile.query().order(Profile.key)
+
+
+def _attendeeRows(prof, websafeConferenceKey):
+    """Yield one row per conference the Profile is registered for."""
+    for wsck in prof.conferenceKeysToAttend:
+        if websafeConferenceKey and wsck != websafeConferenceKey:
+            continue
+        yield {
+            'websafeConferenceKey': wsck,
+            'userId': prof.key.id(),
+            'mainEmail': prof.mainEmail,
+            'displayName': prof.displayName,
+        }
+
+EXPORTS = {
+    'conferences': {
+        'query': _conferenceQuery,
+        'rows': _conferenceRows,
+        'columns': ['websafeKey', 'name', 'description', 'organizerUserId',
+                    'topics', 'city', 'startDate', 'endDate', 'month',
+                    'maxAttendees', 'seatsAvailable'],
+    },
+    'sessions': {
+        'query': _sessionQuery,
+        'rows': _sessionRows,
+        'columns': ['websafeKey', 'websafeConferenceKey', 'name',
+                    'highlights', 'mainEmail', 'duration', 'typeOfSession',
+                    'date', 'startTime'],
+    },
+    'attendees': {
+        'query': _attendeeQuery,
+        'rows': _attendeeRows,
+        'columns': ['websafeConferenceKey', 'userId', 'mainEmail',
+                    'displayName'],
+    },
+}
+
+# - - - Readers & serializers - - - - - - - - - - - - - - - -
+
+def iterBatches(kind, websafeCursor=None, websafeConferenceKey=None,
+                maxRows=EXPORT_MAX_ROWS, timeBudget=EXPORT_TIME_BUDGET):
+    """Yield (rows, continuation) per cursor batch of an export kind.
+
+    Only one batch of entities is held at a time. Stops once maxRows or
+    the time budget is used up; the last continuation is None when the
+    export is complete.
+    """
+    spec = EXPORTS[kind]
+    q = spec['query'](websafeConferenceKey)
+    cursor = Cursor(urlsafe=websafeCursor) if websafeCursor else None
+    began = time.time()
+    exported = 0
+    more = True
+    while more:
+        entities, cursor, more = q.fetch_page(
+            EXPORT_BATCH_SIZE, start_cursor=cursor)
+        rows = [row for ent in entities
+                for row in spec['rows'](ent, websafeConferenceKey)]
+        exported += len(rows)
+        continuation = cursor.urlsafe() if more and cursor else None
+        yield rows, continuation
+        if exported >= maxRows or time.time() - began >= timeBudget:
+            return
+
+
+def _encode(value):
+    """Return value as a UTF-8 CSV cell; lists are joined with ';'."""
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        value = ';'.join(value)
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return str(value)
+
+
+def serialize(kind, rows, fmt, header=False):
+    """Return rows of an export kind serialized as ndjson or csv."""
+    if fmt == 'ndjson':
+        return ''.join(json.dumps(row) + '\n' for row in rows)
+    columns = EXPORTS[kind]['columns']
+    out = StringIO.StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_encode(row.get(col)) for col in columns])
+    return out.getvalue()
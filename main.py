@@ -1,8 +1,19 @@
 #!/usr/bin/env python
+import json
+
 import webapp2
 from google.appengine.api import app_identity
 from google.appengine.api import mail
 from conference import ConferenceApi
+import export
+import migrations
+import notifications
+
+class WarmupHandler(webapp2.RequestHandler):
+    def get(self):
+        """Import the API and prime caches before the instance serves."""
+        # importing conference builds the Endpoints api_server
+        ConferenceApi._warmup()
 
 class SetAnnouncementHandler(webapp2.RequestHandler):
     def get(self):
@@ -10,9 +21,31 @@ class SetAnnouncementHandler(webapp2.RequestHandler):
         # use _cacheAnnouncement() to set announcement in Memcache
         ConferenceApi._cacheAnnouncement()
 
+class ReconcileFacetsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start recounting conference facet counters from Datastore."""
+        ConferenceApi._reconcileFacets()
+
+class ReconcileSeatsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Refresh cached seat counts of hot conferences."""
+        ConferenceApi._reconcileSeats()
+
+class FoldTrendingHandler(webapp2.RequestHandler):
+    def get(self):
+        """Fold registration events into the trending leaderboard."""
+        ConferenceApi._foldTrending()
+
+class SendConfirmationEmailsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Send pending confirmations as one digest per recipient."""
+        notifications.sendPending()
+
 class SendConfirmationEmailHandler(webapp2.RequestHandler):
     def post(self):
         """Send email confirming Conference creation."""
+        # drains push tasks queued before confirmations moved to the
+        # confirmation-email pull queue
         mail.send_mail(
             'noreply@%s.appspotmail.com' % (
                 app_identity.get_application_id()),     # from
@@ -31,8 +64,83 @@ class SetSpeakerHandler(webapp2.RequestHandler):
         ConferenceApi._speakerAnnouncement(self.request.get('websafeconferenceKey'),
         								   self.request.get('websafespeaker'))
 
+class PromoteWaitlistHandler(webapp2.RequestHandler):
+    def post(self):
+        """Register waitlisted users for freed seats in FIFO order."""
+        ConferenceApi._promoteWaitlist(self.request.get('websafeConferenceKey'))
+
+class RecountFacetsHandler(webapp2.RequestHandler):
+    def post(self):
+        """Count one batch of conference facets and chain the next."""
+        ConferenceApi._recountFacets(self.request.get('cursor') or None)
+
+class CleanupConferenceHandler(webapp2.RequestHandler):
+    def post(self):
+        """Remove one batch of a deleted Conference's data and chain the next."""
+        ConferenceApi._cleanupConference(
+            self.request.get('websafeConferenceKey'),
+            self.request.get('phase'),
+            self.request.get('cursor') or None)
+
+class MigrationTaskHandler(webapp2.RequestHandler):
+    def post(self):
+        """Run one batch of a migration and chain the next."""
+        migrations.runBatch(self.request.get('name'),
+                            self.request.get('cursor') or None)
+
+class MigrationAdminHandler(webapp2.RequestHandler):
+    def get(self):
+        """Report progress of all registered migrations."""
+        self.response.headers['Content-Type'] = 'application/json'
+        self.response.write(json.dumps(migrations.progress()))
+
+    def post(self):
+        """Start, resume, restart or pause a migration."""
+        name = self.request.get('name')
+        action = self.request.get('action', 'start')
+        if name not in migrations.MIGRATIONS:
+            self.abort(404, 'No migration registered as: %s' % name)
+        if action == 'pause':
+            migrations.pause(name)
+        elif action in ('start', 'restart'):
+            migrations.start(name, restart=(action == 'restart'))
+        else:
+            self.abort(400, 'Unknown action: %s' % action)
+        self.get()
+
+class ExportHandler(webapp2.RequestHandler):
+    def get(self):
+        """Stream one continuation of a bulk export as ndjson or csv."""
+        kind = self.request.get('kind', 'conferences')
+        fmt = self.request.get('format', 'ndjson')
+        cursor = self.request.get('cursor') or None
+        wsck = self.request.get('websafeConferenceKey') or None
+        if kind not in export.EXPORTS or fmt not in export.FORMATS:
+            self.abort(400, 'Unknown export kind or format.')
+
+        self.response.headers['Content-Type'] = (
+            'text/csv' if fmt == 'csv' else 'application/x-ndjson')
+        continuation = None
+        header = not cursor
+        for rows, continuation in export.iterBatches(kind, cursor, wsck):
+            self.response.write(export.serialize(kind, rows, fmt, header))
+            header = False
+        # clients pass this back as cursor= to fetch the next part
+        self.response.headers['X-Export-Continuation'] = continuation or ''
+
 app = webapp2.WSGIApplication([
+    ('/_ah/warmup', WarmupHandler),
     ('/crons/set_announcement', SetAnnouncementHandler),
+    ('/crons/reconcile_facets', ReconcileFacetsHandler),
+    ('/crons/reconcile_seats', ReconcileSeatsHandler),
+    ('/crons/fold_trending', FoldTrendingHandler),
+    ('/crons/send_confirmation_emails', SendConfirmationEmailsHandler),
     ('/tasks/set_speaker', SetSpeakerHandler),
     ('/tasks/send_confirmation_email', SendConfirmationEmailHandler),
+    ('/tasks/promote_waitlist', PromoteWaitlistHandler),
+    ('/tasks/delete_conference', CleanupConferenceHandler),
+    ('/tasks/recount_facets', RecountFacetsHandler),
+    ('/tasks/migrate', MigrationTaskHandler),
+    ('/admin/migrations', MigrationAdminHandler),
+    ('/admin/export', ExportHandler),
 ], debug=True)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+"""migrations.py
+
+Udacity conference server-side Python App Engine resumable migrations;
+walks a kind in cursor batches, applies a registered transform and chains
+itself through the task queue, checkpointing progress in Migration
+
+"""
+
+import logging
+import time
+
+from google.appengine.api import taskqueue
+from google.appengine.datastore.datastore_query import Cursor
+from google.appengine.ext import ndb
+
+from models import Conference
+from models import Migration
+from models import Profile
+from models import Session
+
+from conference import ConferenceApi
+import related
+
+MIGRATION_TASK_URL = '/tasks/migrate'
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_PER_SECOND = 200
+
+RUNNING = 'RUNNING'
+PAUSED = 'PAUSED'
+DONE = 'DONE'
+
+# registered migrations by name
+MIGRATIONS = {}
+
+# - - - Registry - - - - - - - - - - - - - - - - - - - - - -
+
+def migration(name, model, batch_size=DEFAULT_BATCH_SIZE,
+              max_per_second=DEFAULT_MAX_PER_SECOND):
+    """Register fn(entities) as migration over model's kind; fn returns
+    the entities that need to be written back.
+    """
+    def register(fn):
+        MIGRATIONS[name] = {
+            'model': model,
+            'transform': fn,
+            'batch_size': batch_size,
+            'max_per_second': max_per_second,
+        }
+        return fn
+    return register
+
+# - - - Runner - - - - - - - - - - - - - - - - - - - - - - -
+
+def _enqueue(name, websafeCursor, countdown=0):
+    """Queue the next batch of a migration."""
+    taskqueue.add(params={'name': name, 'cursor': websafeCursor or ''},
+                  url=MIGRATION_TASK_URL,
+                  countdown=countdown,
+                  transactional=ndb.in_transaction())
+
+
+def start(name, restart=False):
+    """Start a migration, resuming from its checkpoint unless restarting."""
+    if name not in MIGRATIONS:
+        raise KeyError('No migration registered as: %s' % name)
+
+    @ndb.transactional
+    def txn():
+        status = Migration.get_by_id(name)
+        if not status or restart:
+            status = Migration(id=name)
+        elif status.state in (RUNNING, DONE):
+            # a running migration already has its next batch queued
+            return status
+        status.state = RUNNING
+        status.put()
+        _enqueue(name, status.cursor)
+        return status
+    return txn()
+
+
+def pause(name):
+    """Stop a running migration after its in-flight batch."""
+    @ndb.transactional
+    def txn():
+        status = Migration.get_by_id(name)
+        if status and status.state == RUNNING:
+            status.state = PAUSED
+            status.put()
+        return status
+    return txn()
+
+
+def runBatch(name, websafeCursor):
+    """Migrate one batch and chain the next one, throttled to the
+    migration's max_per_second.
+    """
+    spec = MIGRATIONS.get(name)
+    status = Migration.get_by_id(name)
+    # drop unknown, paused and duplicate (stale cursor) tasks
+    if not spec or not status or status.state != RUNNING or \
+            (status.cursor or '') != (websafeCursor or ''):
+        logging.info('Skipping migration batch %s at %r', name, websafeCursor)
+        return
+
+    began = time.time()
+    cursor = Cursor(urlsafe=websafeCursor) if websafeCursor else None
+    entities, next_cursor, more = spec['model'].query().fetch_page(
+        spec['batch_size'], start_cursor=cursor)
+    changed = spec['transform'](entities) or []
+    if changed:
+        ndb.put_multi(changed)
+
+    # spread batches out so the average rate stays under the limit
+    elapsed = time.time() - began
+    countdown = max(0, len(entities) / float(spec['max_per_second']) - elapsed)
+
+    @ndb.transactional
+    def checkpoint():
+        status = Migration.get_by_id(name)
+        if (status.cursor or '') != (websafeCursor or ''):
+            return
+        status.processed += len(entities)
+        status.written += len(changed)
+        if more and next_cursor:
+            status.cursor = next_cursor.urlsafe()
+            if status.state == RUNNING:
+                _enqueue(name, status.cursor, countdown)
+        else:
+            status.cursor = None
+            status.state = DONE
+        status.put()
+    checkpoint()
+
+
+def progress():
+    """Return checkpoint status of every registered migration."""
+    statuses = ndb.get_multi(
+        [ndb.Key(Migration, name) for name in sorted(MIGRATIONS)])
+    result = []
+    for name, status in zip(sorted(MIGRATIONS), statuses):
+        result.append({
+            'name': name,
+            'kind': MIGRATIONS[name]['model']._get_kind(),
+            'state': status.state if status else 'NOT_STARTED',
+            'processed': status.processed if status else 0,
+            'written': status.written if status else 0,
+            'started': str(status.started) if status else None,
+            'updated': str(status.updated) if status else None,
+        })
+    return result
+
+# - - - Registered migrations - - - - - - - - - - - - - - - -
+
+@migration('session_datetimes', Session)
+def sessionDatetimes(sessions):
+    """Rewrite Sessions so computed start/end datetimes are indexed."""
+    return sessions
+
+
+@migration('session_conference_fields', Session)
+def sessionConferenceFields(sessions):
+    """Copy parent Conference fields onto Sessions for searchSessions."""
+    c_keys = list(set(session.key.parent() for session in sessions))
+    confs = dict(zip(c_keys, ndb.get_multi(c_keys)))
+    changed = []
+    for session in sessions:
+        conf = confs.get(session.key.parent())
+        if conf:
+            session.populate(**ConferenceApi._conferenceFieldsForSession(conf))
+            changed.append(session)
+    return changed
+
+
+@migration('conference_topic_index', Conference, batch_size=50)
+def conferenceTopicIndex(confs):
+    """Assign dated doc ids and index topics of Conferences created before
+    the topic index existed or indexed under undated doc ids.
+
+    New doc ids are saved before any posting refers to them, so a retried
+    batch reuses them instead of allocating duplicates; indexing is
+    idempotent and covers conferences whose earlier attempt stopped
+    between the two. Writes its own entities and returns none.
+    """
+    related.dropStopTopicPostings()
+    changed = []
+    for conf in confs:
+        if conf.docId is not None and related.isDated(conf.docId):
+            continue
+        if conf.docId is not None:
+            related.unindexConference(conf.docId, conf.topics)
+        conf.docId = related.allocateDocId(conf.key, conf.startDate)
+        changed.append(conf)
+    ndb.put_multi(changed)
+    for conf in confs:
+        if conf.docId is not None:
+            related.indexConference(conf.docId, conf.topics)
+    return []
+
+
+@migration('conference_updated', Conference)
+@migration('session_updated', Session)
+@migration('profile_updated', Profile)
+def touchUpdated(entities):
+    """Rewrite entities so their updated timestamps are set for sync."""
+    return [ent for ent in entities if ent.updated is None]
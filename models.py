@@ -13,14 +13,26 @@ created/forked from conferences.py by wesc on 2014 may 24
 __author__ = 'wesc+api@google.com (Wesley Chun)'
 
 import httplib
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+
 import endpoints
 from protorpc import messages
 from google.appengine.ext import ndb
 
+# entity cache tuning shared by the hot, read-mostly kinds; list endpoints
+# run keys-only queries and resolve entities through this cache
+ENTITY_MEMCACHE_TIMEOUT = 60 * 60
+
 # - - - Conference models - - - - - - - - - - - - - - - - -
 
 class Conference(ndb.Model):
     """Conference -- Conference object"""
+    _use_cache      = True
+    _use_memcache   = True
+    _memcache_timeout = ENTITY_MEMCACHE_TIMEOUT
+
     name            = ndb.StringProperty(required=True)
     description     = ndb.StringProperty()
     organizerUserId = ndb.StringProperty()
@@ -31,6 +43,9 @@ class Conference(ndb.Model):
     endDate         = ndb.DateProperty()
     maxAttendees    = ndb.IntegerProperty()
     seatsAvailable  = ndb.IntegerProperty()
+    # compact id in the topic index used by getRelatedConferences
+    docId           = ndb.IntegerProperty()
+    updated         = ndb.DateTimeProperty(auto_now=True)
 
 class ConferenceForm(messages.Message):
     """ConferenceForm -- Conference outbound form message"""
@@ -51,6 +66,16 @@ class ConferenceForms(messages.Message):
     """ConferenceForms -- multiple Conference outbound form message"""
     items = messages.MessageField(ConferenceForm, 1, repeated=True)
 
+class ConferenceLookupForm(messages.Message):
+    """ConferenceLookupForm -- one result of a batch Conference lookup"""
+    websafeKey = messages.StringField(1)
+    found      = messages.BooleanField(2)
+    conference = messages.MessageField(ConferenceForm, 3)
+
+class ConferenceLookupForms(messages.Message):
+    """ConferenceLookupForms -- batch Conference lookup results, in request order"""
+    items = messages.MessageField(ConferenceLookupForm, 1, repeated=True)
+
 class ConferenceQueryForm(messages.Message):
     """ConferenceQueryForm -- Conference query inbound form message"""
     field = messages.StringField(1)
@@ -61,19 +86,71 @@ class ConferenceQueryForms(messages.Message):
     """ConferenceQueryForms -- multiple ConferenceQueryForm inbound form message"""
     filters = messages.MessageField(ConferenceQueryForm, 1, repeated=True)
 
+class FacetCount(messages.Message):
+    """FacetCount -- number of conferences for one facet value"""
+    value = messages.StringField(1)
+    count = messages.IntegerField(2)
+
+class FacetForm(messages.Message):
+    """FacetForm -- counts per value of one conference filter field"""
+    field  = messages.StringField(1)
+    counts = messages.MessageField(FacetCount, 2, repeated=True)
+
+class FacetForms(messages.Message):
+    """FacetForms -- multiple FacetForm outbound form message"""
+    items     = messages.MessageField(FacetForm, 1, repeated=True)
+    # narrowed counts only cover the first FACET_SCAN_LIMIT matches
+    truncated = messages.BooleanField(2)
+
+class WebsafeKeysForm(messages.Message):
+    """WebsafeKeysForm -- inbound list of websafe entity keys"""
+    websafeKeys = messages.StringField(1, repeated=True)
+
 # needed for conference registration
 class BooleanMessage(messages.Message):
     """BooleanMessage-- outbound Boolean value message"""
     data = messages.BooleanField(1)
 
+class SeatsAvailableForm(messages.Message):
+    """SeatsAvailableForm -- outbound seat availability of a Conference"""
+    websafeConferenceKey = messages.StringField(1)
+    seatsAvailable       = messages.IntegerField(2)
+
+class WaitlistForm(messages.Message):
+    """WaitlistForm -- outbound waitlist position for a Conference"""
+    websafeConferenceKey = messages.StringField(1)
+    position             = messages.IntegerField(2)
+
 class ConflictException(endpoints.ServiceException):
     """ConflictException -- exception mapped to HTTP 409 response"""
     http_status = httplib.CONFLICT
 
+class RateLimitedException(endpoints.ServiceException):
+    """RateLimitedException -- exception mapped to HTTP 503 response"""
+    # endpoints has no 429 mapping (httplib.responses lacks it)
+    http_status = httplib.SERVICE_UNAVAILABLE
+
 # - - - Session models - - - - - - - - - - - - - - - - -
 
+def _sessionStart(session):
+    """Combine Session date and startTime into one datetime."""
+    if session.date is None:
+        return None
+    return datetime.combine(session.date, session.startTime or time())
+
+def _sessionEnd(session):
+    """Derive Session end datetime from its start and duration (minutes)."""
+    start = _sessionStart(session)
+    if start is None:
+        return None
+    return start + timedelta(minutes=session.duration or 0)
+
 class Session(ndb.Model):
     """Session -- Session object"""
+    _use_cache      = True
+    _use_memcache   = True
+    _memcache_timeout = ENTITY_MEMCACHE_TIMEOUT
+
     name            = ndb.StringProperty(required=True)
     highlights      = ndb.StringProperty()
     mainEmail       = ndb.StringProperty(required=True)
@@ -81,6 +158,17 @@ class Session(ndb.Model):
     typeOfSession   = ndb.StringProperty(default='NOT_SPECIFIED')
     date            = ndb.DateProperty()
     startTime       = ndb.TimeProperty()
+    # combined, indexed start/end so time windows spanning days are a
+    # single range scan; recomputed on every put
+    startDateTime   = ndb.ComputedProperty(_sessionStart)
+    endDateTime     = ndb.ComputedProperty(_sessionEnd)
+    # denormalized from the parent Conference for cross-conference search;
+    # copied when the Session is created (Conferences are not editable) and
+    # backfilled by the session_conference_fields migration
+    conferenceCity   = ndb.StringProperty()
+    conferenceTopics = ndb.StringProperty(repeated=True)
+    conferenceMonth  = ndb.IntegerProperty()
+    updated         = ndb.DateTimeProperty(auto_now=True)
 
 class SessionForm(messages.Message):
     """SessionForm -- Session outbound form message"""
@@ -97,6 +185,27 @@ class SessionForm(messages.Message):
 class SessionForms(messages.Message):
     """SessionForms -- multiple Session outbound form message"""
     items = messages.MessageField(SessionForm, 1, repeated=True)
+    nextPageToken = messages.StringField(2)
+
+class WishlistConflictForm(messages.Message):
+    """WishlistConflictForm -- wishlisted Sessions with overlapping times"""
+    start    = messages.StringField(1)
+    end      = messages.StringField(2)
+    sessions = messages.MessageField(SessionForm, 3, repeated=True)
+
+class WishlistConflictForms(messages.Message):
+    """WishlistConflictForms -- conflict groups of a wishlist, by start"""
+    items = messages.MessageField(WishlistConflictForm, 1, repeated=True)
+
+class SessionLookupForm(messages.Message):
+    """SessionLookupForm -- one result of a batch Session lookup"""
+    websafeKey = messages.StringField(1)
+    found      = messages.BooleanField(2)
+    session    = messages.MessageField(SessionForm, 3)
+
+class SessionLookupForms(messages.Message):
+    """SessionLookupForms -- batch Session lookup results, in request order"""
+    items = messages.MessageField(SessionLookupForm, 1, repeated=True)
 
 class SessionQueryForm(messages.Message):
     """SessionQueryForm -- Session query inbound form message"""
@@ -108,6 +217,13 @@ class SessionQueryForms(messages.Message):
     """SessionQueryForms -- multiple SessionQueryForm inbound form message"""
     filters = messages.MessageField(ConferenceQueryForm, 1, repeated=True)
 
+class SessionSearchForm(messages.Message):
+    """SessionSearchForm -- cross-conference Session search inbound form message"""
+    filters           = messages.MessageField(ConferenceQueryForm, 1, repeated=True)
+    conferenceFilters = messages.MessageField(ConferenceQueryForm, 2, repeated=True)
+    maxResults        = messages.IntegerField(3, default=20)
+    pageToken         = messages.StringField(4)
+
 class TypeOfSession(messages.Enum):
     """TypeOfSession -- enumeration value for session types"""
     NOT_SPECIFIED = 1
@@ -127,6 +243,7 @@ class Profile(ndb.Model):
     conferenceKeysToAttend = ndb.StringProperty(repeated=True)
     sessionsInWishlist     = ndb.KeyProperty(kind=Session, repeated=True)
     speakerOfSessions      = ndb.KeyProperty(kind=Session, repeated=True)
+    updated                = ndb.DateTimeProperty(auto_now=True)
 
 class ProfileMiniForm(messages.Message):
     """ProfileMiniForm -- update Profile form message"""
@@ -160,8 +277,82 @@ class TeeShirtSize(messages.Enum):
     XXXL_M = 14
     XXXL_W = 15
 
+# - - - Sync models - - - - - - - - - - - - - - - - -
+
+class Tombstone(ndb.Model):
+    """Tombstone -- records a deleted entity for delta sync clients"""
+    websafeKey      = ndb.StringProperty(indexed=False)
+    kind            = ndb.StringProperty(indexed=False)
+    deleted         = ndb.DateTimeProperty(auto_now_add=True)
+
+class SyncForm(messages.Message):
+    """SyncForm -- entities changed since a client watermark"""
+    conferences            = messages.MessageField(ConferenceForm, 1, repeated=True)
+    sessions               = messages.MessageField(SessionForm, 2, repeated=True)
+    profile                = messages.MessageField(ProfileForm, 3)
+    conferenceKeysToAttend = messages.StringField(4, repeated=True)
+    sessionsInWishlist     = messages.StringField(5, repeated=True)
+    deletedKeys            = messages.StringField(6, repeated=True)
+    watermark              = messages.StringField(7)
+    more                   = messages.BooleanField(8)
+
 # - - - Announcement - - - - - - - - - - - - - - - - -
 
 class StringMessage(messages.Message):
     """StringMessage-- outbound (single) string message"""
-    data = messages.StringField(1, required=True)
\ No newline at end of file
+    data = messages.StringField(1, required=True)
+
+# - - - Waitlist models - - - - - - - - - - - - - - - - -
+
+class WaitlistEntry(ndb.Model):
+    """WaitlistEntry -- a user waiting for a seat, keyed by conference & user;
+    root entities so joining never contends on the Conference entity group
+    """
+    conference      = ndb.KeyProperty(kind=Conference)
+    userId          = ndb.StringProperty(indexed=False)
+    created         = ndb.DateTimeProperty(auto_now_add=True)
+
+# - - - Topic index models - - - - - - - - - - - - - - - -
+
+class TopicPosting(ndb.Model):
+    """TopicPosting -- sorted packed Conference doc ids of a topic, keyed
+    by normalized topic
+    """
+    postings        = ndb.BlobProperty(default='')
+
+class ConferenceDoc(ndb.Model):
+    """ConferenceDoc -- maps a topic index doc id to its Conference"""
+    conference      = ndb.KeyProperty(kind=Conference, indexed=False)
+
+# - - - Leaderboard models - - - - - - - - - - - - - - - -
+
+class Leaderboard(ndb.Model):
+    """Leaderboard -- bounded list of [websafeKey, score] pairs, best first"""
+    scores          = ndb.JsonProperty(default=[])
+    updated         = ndb.DateTimeProperty()
+
+# - - - Counter models - - - - - - - - - - - - - - - - -
+
+class CounterShard(ndb.Model):
+    """CounterShard -- one shard of a named count within a group"""
+    group           = ndb.StringProperty()
+    name            = ndb.StringProperty(indexed=False)
+    count           = ndb.IntegerProperty(default=0, indexed=False)
+
+class FacetRecount(ndb.Model):
+    """FacetRecount -- {facet field: {value: count}} of a running recount"""
+    totals          = ndb.JsonProperty(default={})
+    cursor          = ndb.TextProperty()
+    done            = ndb.BooleanProperty(default=False, indexed=False)
+    started         = ndb.DateTimeProperty(auto_now_add=True)
+
+# - - - Migration models - - - - - - - - - - - - - - - - -
+
+class Migration(ndb.Model):
+    """Migration -- checkpoint of a resumable migration, keyed by name"""
+    state           = ndb.StringProperty(default='RUNNING')
+    cursor          = ndb.TextProperty()
+    processed       = ndb.IntegerProperty(default=0)
+    written         = ndb.IntegerProperty(default=0)
+    started         = ndb.DateTimeProperty(auto_now_add=True)
+    updated         = ndb.DateTimeProperty(auto_now=True)
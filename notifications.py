@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+"""notifications.py
+
+Udacity conference server-side Python App Engine confirmation mail
+pipeline; producers add a compact pull task tagged with the recipient,
+and a cron-driven worker leases each recipient's tasks by tag, sends one
+digest per recipient with bounded concurrency and backs off failed sends
+
+"""
+
+import json
+import logging
+import threading
+import time
+import Queue
+from collections import defaultdict
+
+from google.appengine.api import app_identity
+from google.appengine.api import mail
+from google.appengine.api import taskqueue
+from google.appengine.ext import ndb
+from google.appengine.runtime import apiproxy_errors
+
+CONFIRMATION_QUEUE = 'confirmation-email'
+# recipients leased per batch, and confirmations per recipient digest
+DIGESTS_PER_BATCH = 20
+LEASE_BATCH_SIZE = 100
+LEASE_SECONDS = 120
+# digests sent in parallel per worker run
+MAIL_CONCURRENCY = 4
+# attempts per digest within a run, sleeping SEND_BACKOFF * 2**n between
+SEND_ATTEMPTS = 3
+SEND_BACKOFF = 0.5
+# a digest that still fails is leased out for RETRY_BACKOFF * 2**retries,
+# and dropped once its confirmations are older than MAX_TASK_AGE
+RETRY_BACKOFF = 60
+MAX_RETRY_BACKOFF = 3600
+MAX_TASK_AGE = 3 * 24 * 60 * 60
+# digests not sent because mail quota ran out wait this long, without
+# counting as failures
+QUOTA_BACKOFF = 15 * 60
+# seconds of leasing and sending per worker run
+SEND_TIME_BUDGET = 45
+
+# errors retrying will not fix
+PERMANENT_MAIL_ERRORS = (mail.InvalidEmailError, mail.InvalidSenderError,
+                         mail.MissingRecipientsError, mail.BadRequestError)
+
+# - - - Producers - - - - - - - - - - - - - - - - - - - - - -
+
+def queueConferenceCreated(email, c_key):
+    """Record a pending creation confirmation of a Conference for email."""
+    payload = json.dumps({'websafeConferenceKey': c_key.urlsafe(),
+                          'queued': int(time.time())})
+    taskqueue.Queue(CONFIRMATION_QUEUE).add(
+        taskqueue.Task(payload=payload, method='PULL', tag=email),
+        transactional=ndb.in_transaction())
+
+# - - - Digests - - - - - - - - - - - - - - - - - - - - - - -
+
+def _describeConference(conf):
+    """Return the digest lines describing one Conference."""
+    lines = [conf.name]
+    if conf.city:
+        lines.append('  City: %s' % conf.city)
+    if conf.startDate:
+        lines.append('  Dates: %s to %s' % (conf.startDate,
+                                            conf.endDate or conf.startDate))
+    if conf.topics:
+        lines.append('  Topics: %s' % ', '.join(conf.topics))
+    if conf.maxAttendees:
+        lines.append('  Seats: %d' % conf.maxAttendees)
+    return '\r\n'.join(lines)
+
+
+def _sendDigest(sender, email, confs):
+    """Send one digest mail, retrying transient errors with backoff."""
+    if len(confs) == 1:
+        subject = 'You created a new Conference!'
+    else:
+        subject = 'You created %d new Conferences!' % len(confs)
+    body = 'Hi, you have created the following conference%s:\r\n\r\n%s' % (
+        '' if len(confs) == 1 else 's',
+        '\r\n\r\n'.join(_describeConference(conf) for conf in confs))
+
+    for attempt in range(SEND_ATTEMPTS):
+        try:
+            mail.send_mail(sender, email, subject, body)
+            return
+        except (apiproxy_errors.OverQuotaError,) + PERMANENT_MAIL_ERRORS:
+            raise
+        except Exception:
+            if attempt == SEND_ATTEMPTS - 1:
+                raise
+            time.sleep(SEND_BACKOFF * 2 ** attempt)
+
+
+def _sendWorker(sender, jobs, results, overQuota):
+    """Send queued digests until none are left or mail quota runs out."""
+    while not overQuota.is_set():
+        try:
+            email, confs, tasks = jobs.get_nowait()
+        except Queue.Empty:
+            return
+        try:
+            _sendDigest(sender, email, confs)
+        except apiproxy_errors.OverQuotaError:
+            logging.warning('Mail quota exhausted; deferring digests')
+            overQuota.set()
+        except PERMANENT_MAIL_ERRORS:
+            logging.exception('Dropping confirmation digest to %s', email)
+            results['dropped'].extend(tasks)
+        except Exception:
+            logging.exception('Confirmation digest to %s failed', email)
+            results['failed'].extend(tasks)
+        else:
+            results['sent'].extend(tasks)
+
+
+def _backoff(queue, tasks):
+    """Keep failed tasks leased for an exponential backoff, dropping the
+    ones whose confirmations are older than MAX_TASK_AGE.
+    """
+    expired = []
+    now = time.time()
+    for task in tasks:
+        queued = json.loads(task.payload).get('queued', now)
+        if now - queued > MAX_TASK_AGE:
+            logging.error('Giving up on confirmation to %s: %s',
+                          task.tag, task.payload)
+            expired.append(task)
+        else:
+            queue.modify_task_lease(task, min(
+                MAX_RETRY_BACKOFF, RETRY_BACKOFF * 2 ** task.retry_count))
+    if expired:
+        queue.delete_tasks(expired)
+
+
+def _defer(queue, tasks):
+    """Hold back tasks that were never attempted for QUOTA_BACKOFF; they
+    do not count as failures.
+    """
+    for task in tasks:
+        queue.modify_task_lease(task, QUOTA_BACKOFF)
+
+# - - - Worker - - - - - - - - - - - - - - - - - - - - - - - -
+
+def _leaseRecipients(queue):
+    """Lease the pending confirmations of up to DIGESTS_PER_BATCH
+    recipients; return {recipient: tasks}.
+    """
+    byRecipient = defaultdict(list)
+    for _ in range(DIGESTS_PER_BATCH):
+        # all leased tasks share the tag of the oldest pending task
+        tasks = queue.lease_tasks_by_tag(LEASE_SECONDS, LEASE_BATCH_SIZE)
+        if not tasks:
+            break
+        for task in tasks:
+            byRecipient[task.tag].append(task)
+    return byRecipient
+
+
+def sendBatch(queue):
+    """Lease a batch of recipients' pending confirmations and send them as
+    one digest per recipient; return (tasks leased, False if mail quota
+    ran out).
+    """
+    byRecipient = _leaseRecipients(queue)
+    tasks = [task for recipientTasks in byRecipient.values()
+             for task in recipientTasks]
+    if not tasks:
+        return 0, True
+
+    confKeys = {}
+    for task in tasks:
+        confKeys[task.name] = ndb.Key(
+            urlsafe=json.loads(task.payload)['websafeConferenceKey'])
+    c_keys = list(set(confKeys.values()))
+    confs = dict(zip(c_keys, ndb.get_multi(c_keys)))
+
+    results = {'sent': [], 'dropped': [], 'failed': []}
+    jobs = Queue.Queue()
+    for email, recipientTasks in byRecipient.items():
+        # one line per conference, even if its confirmation was queued twice
+        keys = set(confKeys[task.name] for task in recipientTasks)
+        found = sorted((confs[key] for key in keys if confs[key]),
+                       key=lambda conf: conf.name)
+        if found:
+            jobs.put((email, found, recipientTasks))
+        else:
+            # every conference was deleted before its confirmation went out
+            results['dropped'].extend(recipientTasks)
+
+    sender = 'noreply@%s.appspotmail.com' % app_identity.get_application_id()
+    overQuota = threading.Event()
+    workers = [threading.Thread(target=_sendWorker,
+                                args=(sender, jobs, results, overQuota))
+               for _ in range(min(MAIL_CONCURRENCY, jobs.qsize()))]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    finished = results['sent'] + results['dropped']
+    if finished:
+        queue.delete_tasks(finished)
+    _backoff(queue, results['failed'])
+    # digests cut off by the mail quota were never really attempted
+    attempted = set(task.name for task in finished + results['failed'])
+    _defer(queue, [task for task in tasks if task.name not in attempted])
+    return len(tasks), not overQuota.is_set()
+
+
+def sendPending(timeBudget=SEND_TIME_BUDGET):
+    """Drain pending confirmations batch by batch within the time budget."""
+    queue = taskqueue.Queue(CONFIRMATION_QUEUE)
+    began = time.time()
+    while time.time() - began < timeBudget:
+        leased, ok = sendBatch(queue)
+        if not leased or not ok:
+            return
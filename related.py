@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+"""related.py
+
+Udacity conference server-side Python App Engine topic index; each
+Conference gets a compact integer doc id and every topic keeps a sorted,
+packed array of the doc ids tagged with it, so related conferences are
+ranked from a single batch get of postings
+
+"""
+
+import array
+import bisect
+from collections import defaultdict
+from datetime import date
+from datetime import datetime
+
+from google.appengine.ext import ndb
+
+from models import ConferenceDoc
+from models import TopicPosting
+
+# unsigned 64-bit doc ids, 8 bytes per posting
+POSTING_TYPECODE = 'L'
+
+# doc ids carry the conference's start date in their high bits, so sorted
+# postings are ordered by start date and past conferences form a prefix
+# that lookups skip and rewrites prune
+DOC_DATE_SHIFT = 40
+# conferences without a start date never expire
+UNDATED = date.max
+
+# placeholder topics conference.DEFAULTS gives topic-less conferences; they
+# say nothing about a conference and every such conference would write
+# the same two postings
+STOP_TOPICS = frozenset(['default', 'topic'])
+
+
+def _topicId(topic):
+    """Return normalized TopicPosting id of a topic."""
+    return topic.strip().lower()
+
+
+def _topicIds(topics):
+    """Return the distinct indexable topic ids of a list of topics."""
+    return set(_topicId(t) for t in topics or []
+               if t.strip() and _topicId(t) not in STOP_TOPICS)
+
+
+def _dateFloor(day):
+    """Return the smallest doc id of conferences starting on day."""
+    return day.toordinal() << DOC_DATE_SHIFT
+
+
+def isDated(docId):
+    """Return True if docId carries a start date (current id scheme)."""
+    return docId >> DOC_DATE_SHIFT > 0
+
+
+def decodePostings(blob):
+    """Return array of doc ids packed in a postings blob."""
+    postings = array.array(POSTING_TYPECODE)
+    if blob:
+        postings.fromstring(blob)
+    return postings
+
+
+@ndb.transactional
+def _addPosting(topic, docId, floor):
+    """Insert docId into the sorted postings of a topic, pruning doc ids
+    of conferences that started before floor.
+    """
+    posting = TopicPosting.get_or_insert(_topicId(topic))
+    postings = decodePostings(posting.postings)
+    past = bisect.bisect_left(postings, floor)
+    i = bisect.bisect_left(postings, docId)
+    exists = i < len(postings) and postings[i] == docId
+    # a conference that already started is not worth indexing
+    if docId >= floor and not exists:
+        postings.insert(i, docId)
+    elif not past:
+        return
+    del postings[:past]
+    posting.postings = postings.tostring()
+    posting.put()
+
+
+@ndb.transactional
+def _removePosting(topic, docId):
+    """Remove docId from the postings of a topic."""
+    posting = TopicPosting.get_by_id(_topicId(topic))
+    if not posting:
+        return
+    postings = decodePostings(posting.postings)
+    i = bisect.bisect_left(postings, docId)
+    if i < len(postings) and postings[i] == docId:
+        postings.pop(i)
+        posting.postings = postings.tostring()
+        posting.put()
+
+
+def allocateDocId(c_key, startDate):
+    """Allocate a doc id for a Conference key starting on startDate and
+    record the mapping.
+    """
+    # allocated ids stay far below 2**DOC_DATE_SHIFT
+    seq = ConferenceDoc.allocate_ids(size=1)[0]
+    docId = _dateFloor(startDate or UNDATED) | seq
+    ConferenceDoc(id=docId, conference=c_key).put()
+    return docId
+
+
+def indexConference(docId, topics):
+    """Add a Conference's doc id to the postings of its topics."""
+    floor = _dateFloor(datetime.utcnow().date())
+    for topic in _topicIds(topics):
+        _addPosting(topic, docId, floor)
+
+
+def unindexConference(docId, topics):
+    """Remove a Conference's doc id from its topics and drop its doc."""
+    for topic in _topicIds(topics):
+        _removePosting(topic, docId)
+    ndb.Key(ConferenceDoc, docId).delete()
+
+
+def dropStopTopicPostings():
+    """Delete the postings of STOP_TOPICS written before they were skipped."""
+    ndb.delete_multi([ndb.Key(TopicPosting, t) for t in STOP_TOPICS])
+
+
+def overlapCandidates(docId, topics, limit, since=None):
+    """Return [(conference key, shared topic count)] of the conferences
+    starting on or after since (default today) that share most topics
+    with docId, best first and soonest first among ties.
+    """
+    floor = _dateFloor(since or datetime.utcnow().date())
+    overlap = defaultdict(int)
+    for posting in ndb.get_multi(
+            [ndb.Key(TopicPosting, t) for t in _topicIds(topics)]):
+        if posting:
+            postings = decodePostings(posting.postings)
+            # skip the sorted prefix of conferences that already started
+            for other in postings[bisect.bisect_left(postings, floor):]:
+                overlap[other] += 1
+    overlap.pop(docId, None)
+
+    best = sorted(overlap.items(), key=lambda dc: (-dc[1], dc[0]))[:limit]
+    docs = ndb.get_multi([ndb.Key(ConferenceDoc, d) for d, c in best])
+    return [(doc.conference, count)
+            for doc, (d, count) in zip(docs, best) if doc]
@@ -14,3 +14,13 @@ created/forked from conference.py by wesc on 2014 may 24
 # Console or Cloud Console.
 WEB_CLIENT_ID = '479888841620-fhl77tf6h1mklfv421qs9plh76tck7b2.apps.googleusercontent.com'
 
+# Admission control for write endpoints: token buckets per conference and
+# per user as (tokens refilled per second, burst size). Requests beyond
+# these rates are rejected with HTTP 503 before reaching a transaction.
+RATE_LIMITS = {
+    'registerForConference': {'conference': (5, 20), 'user': (0.5, 5)},
+    'unregisterFromConference': {'conference': (5, 20), 'user': (0.5, 5)},
+    'joinWaitlist': {'conference': (20, 100), 'user': (0.5, 5)},
+    'createSession': {'conference': (2, 10), 'user': (1, 10)},
+    'addSessionToWishlist': {'conference': (20, 100), 'user': (1, 10)},
+}
@@ -76,6 +76,227 @@ app.constant('HTTP_ERRORS', {
 });
 
 
+/**
+ * @ngdoc constant
+ * @name API_CACHE
+ *
+ * @description
+ * Settings of the conferenceClient response cache. Bump VERSION whenever the API responses change shape so that
+ * responses cached in localStorage by older code are ignored. TTLS holds the time to live in milliseconds of each
+ * cacheable method; INVALIDATES lists the cached methods whose responses a successful mutating call makes stale.
+ *
+ */
+app.constant('API_CACHE', {
+    VERSION: 1,
+    TTLS: {
+        getProfile: 10 * 60 * 1000,
+        getConference: 60 * 1000,
+        queryConferences: 60 * 1000,
+        getConferenceFacets: 60 * 1000,
+        getConferencesCreated: 5 * 60 * 1000,
+        getConferencesToAttend: 5 * 60 * 1000,
+        getTrendingConferences: 5 * 60 * 1000
+    },
+    INVALIDATES: {
+        saveProfile: ['getProfile'],
+        createConference: ['queryConferences', 'getConferenceFacets', 'getConferencesCreated'],
+        registerForConference: ['getProfile', 'getConference', 'queryConferences', 'getConferencesCreated',
+            'getConferencesToAttend', 'getTrendingConferences'],
+        unregisterFromConference: ['getProfile', 'getConference', 'queryConferences', 'getConferencesCreated',
+            'getConferencesToAttend', 'getTrendingConferences']
+    }
+});
+
+
+/**
+ * @ngdoc service
+ * @name conferenceClient
+ *
+ * @description
+ * Shared data layer in front of gapi.client.conference. Responses of cacheable methods are kept in memory and
+ * localStorage until their TTL expires, concurrent identical calls share one request, and successful mutating calls
+ * invalidate the responses they make stale.
+ *
+ */
+app.factory('conferenceClient', function (API_CACHE) {
+    var prefix = 'conferenceClient:v' + API_CACHE.VERSION + ':';
+    var memory = {};
+    var inflight = {};
+
+    var storage = (function () {
+        try {
+            window.localStorage.setItem(prefix + 'probe', '1');
+            window.localStorage.removeItem(prefix + 'probe');
+            return window.localStorage;
+        } catch (e) {
+            // Private browsing or storage disabled; keep the memory tier only.
+            return null;
+        }
+    })();
+
+    var read = function (key) {
+        var entry = memory[key];
+        if (!entry && storage) {
+            try {
+                entry = JSON.parse(storage.getItem(key));
+            } catch (e) {
+                entry = null;
+            }
+            if (entry) {
+                memory[key] = entry;
+            }
+        }
+        if (entry && entry.expires > Date.now()) {
+            return entry.resp;
+        }
+        return null;
+    };
+
+    var write = function (key, resp, ttl) {
+        var entry = {resp: resp, expires: Date.now() + ttl};
+        memory[key] = entry;
+        if (storage) {
+            try {
+                storage.setItem(key, JSON.stringify(entry));
+            } catch (e) {
+                // Quota exceeded; the memory tier still holds the response.
+            }
+        }
+    };
+
+    /**
+     * Returns a short hash of the current access token. Responses can be user specific, so cached ones are only
+     * served while the token they were fetched with is in use; the token itself is never stored.
+     */
+    var tokenTag = function () {
+        var token = gapi.auth && gapi.auth.getToken();
+        var value = (token && token.access_token) || '';
+        var hash = 0;
+        for (var i = 0; i < value.length; i++) {
+            hash = (hash * 31 + value.charCodeAt(i)) | 0;
+        }
+        return String(hash);
+    };
+
+    var owner = storage ? storage.getItem(prefix + 'owner') : null;
+
+    var conferenceClient = {};
+
+    /**
+     * Drops every cached response when the access token changed since they were stored, e.g. when a session is
+     * restored for a different Google account. Returns the current token tag.
+     */
+    var checkOwner = function () {
+        var tag = tokenTag();
+        if (tag !== owner) {
+            conferenceClient.clear();
+            owner = tag;
+            if (storage) {
+                try {
+                    storage.setItem(prefix + 'owner', tag);
+                } catch (e) {
+                    // The memory tier is cleared all the same.
+                }
+            }
+        }
+        return tag;
+    };
+
+    /**
+     * Drops the cached responses of the given methods, or of all methods if none are given.
+     *
+     * @param {string[]=} methods
+     */
+    conferenceClient.invalidate = function (methods) {
+        var matches = function (key) {
+            if (key.indexOf(prefix) !== 0) {
+                return false;
+            }
+            if (!methods) {
+                return true;
+            }
+            for (var i = 0; i < methods.length; i++) {
+                if (key.indexOf(prefix + methods[i] + ':') === 0) {
+                    return true;
+                }
+            }
+            return false;
+        };
+        angular.forEach(Object.keys(memory), function (key) {
+            if (matches(key)) {
+                delete memory[key];
+            }
+        });
+        if (storage) {
+            for (var i = storage.length - 1; i >= 0; i--) {
+                var key = storage.key(i);
+                if (key && matches(key)) {
+                    storage.removeItem(key);
+                }
+            }
+        }
+    };
+
+    /**
+     * Drops every cached response, e.g. when the signed in user changes.
+     */
+    conferenceClient.clear = function () {
+        conferenceClient.invalidate();
+    };
+
+    /**
+     * Invokes gapi.client.conference[method](params) and passes the response to callback, like execute() does.
+     * The callback is always invoked asynchronously, also when the response comes from the cache.
+     *
+     * @param {string} method the conference API method name.
+     * @param {Object=} params the request parameters.
+     * @param {function} callback
+     */
+    conferenceClient.execute = function (method, params, callback) {
+        var ttl = API_CACHE.TTLS[method];
+        var key = prefix + method + ':' + JSON.stringify(params || {});
+        var tag = checkOwner();
+        // Calls made under different tokens never share a request.
+        var flight = tag + '|' + key;
+
+        if (ttl) {
+            var cached = read(key);
+            if (cached) {
+                setTimeout(function () {
+                    callback(cached);
+                }, 0);
+                return;
+            }
+            // Collapse concurrent identical calls into the one in flight.
+            if (inflight[flight]) {
+                inflight[flight].push(callback);
+                return;
+            }
+            inflight[flight] = [callback];
+        }
+
+        gapi.client.conference[method](params || {}).execute(function (resp) {
+            if (!resp.error) {
+                // Skip responses fetched with a token that was replaced meanwhile.
+                if (ttl && tag === owner) {
+                    write(key, resp, ttl);
+                }
+                if (API_CACHE.INVALIDATES[method]) {
+                    conferenceClient.invalidate(API_CACHE.INVALIDATES[method]);
+                }
+            }
+            var callbacks = ttl ? inflight[flight] : [callback];
+            delete inflight[flight];
+            angular.forEach(callbacks, function (cb) {
+                cb(resp);
+            });
+        });
+    };
+
+    return conferenceClient;
+});
+
+
 /**
  * @ngdoc service
  * @name oauth2Provider
@@ -84,7 +305,7 @@ app.constant('HTTP_ERRORS', {
  * Service that holds the OAuth2 information shared across all the pages.
  *
  */
-app.factory('oauth2Provider', function ($modal) {
+app.factory('oauth2Provider', function ($modal, conferenceClient) {
     var oauth2Provider = {
         CLIENT_ID: '479888841620-fhl77tf6h1mklfv421qs9plh76tck7b2.apps.googleusercontent.com',
         SCOPES: 'email profile',
@@ -95,6 +316,8 @@ app.factory('oauth2Provider', function ($modal) {
      * Calls the OAuth2 authentication method.
      */
     oauth2Provider.signIn = function (callback) {
+        // Cached responses may belong to a previous user.
+        conferenceClient.clear();
         gapi.auth.signIn({
             'clientid': oauth2Provider.CLIENT_ID,
             'cookiepolicy': 'single_host_origin',
@@ -109,6 +332,7 @@ app.factory('oauth2Provider', function ($modal) {
      * Logs out the user.
      */
     oauth2Provider.signOut = function () {
+        conferenceClient.clear();
         gapi.auth.signOut();
         // Explicitly set the invalid access token in order to make the API calls fail.
         gapi.auth.setToken({access_token: ''})
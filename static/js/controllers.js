@@ -25,7 +25,7 @@ conferenceApp.controllers = angular.module('conferenceControllers', ['ui.bootstr
  * A controller used for the My Profile page.
  */
 conferenceApp.controllers.controller('MyProfileCtrl',
-    function ($scope, $log, oauth2Provider, HTTP_ERRORS) {
+    function ($scope, $log, oauth2Provider, conferenceClient, HTTP_ERRORS) {
         $scope.submitted = false;
         $scope.loading = false;
 
@@ -63,21 +63,19 @@ conferenceApp.controllers.controller('MyProfileCtrl',
             var retrieveProfileCallback = function () {
                 $scope.profile = {};
                 $scope.loading = true;
-                gapi.client.conference.getProfile().
-                    execute(function (resp) {
-                        $scope.$apply(function () {
-                            $scope.loading = false;
-                            if (resp.error) {
-                                // Failed to get a user profile.
-                            } else {
-                                // Succeeded to get the user profile.
-                                $scope.profile.displayName = resp.result.displayName;
-                                $scope.profile.teeShirtSize = resp.result.teeShirtSize;
-                                $scope.initialProfile = resp.result;
-                            }
-                        });
-                    }
-                );
+                conferenceClient.execute('getProfile', null, function (resp) {
+                    $scope.$apply(function () {
+                        $scope.loading = false;
+                        if (resp.error) {
+                            // Failed to get a user profile.
+                        } else {
+                            // Succeeded to get the user profile.
+                            $scope.profile.displayName = resp.result.displayName;
+                            $scope.profile.teeShirtSize = resp.result.teeShirtSize;
+                            $scope.initialProfile = resp.result;
+                        }
+                    });
+                });
             };
             if (!oauth2Provider.signedIn) {
                 var modalInstance = oauth2Provider.showLoginModal();
@@ -94,35 +92,34 @@ conferenceApp.controllers.controller('MyProfileCtrl',
         $scope.saveProfile = function () {
             $scope.submitted = true;
             $scope.loading = true;
-            gapi.client.conference.saveProfile($scope.profile).
-                execute(function (resp) {
-                    $scope.$apply(function () {
-                        $scope.loading = false;
-                        if (resp.error) {
-                            // The request has failed.
-                            var errorMessage = resp.error.message || '';
-                            $scope.messages = 'Failed to update a profile : ' + errorMessage;
-                            $scope.alertStatus = 'warning';
-                            $log.error($scope.messages + 'Profile : ' + JSON.stringify($scope.profile));
-
-                            if (resp.code && resp.code == HTTP_ERRORS.UNAUTHORIZED) {
-                                oauth2Provider.showLoginModal();
-                                return;
-                            }
-                        } else {
-                            // The request has succeeded.
-                            $scope.messages = 'The profile has been updated';
-                            $scope.alertStatus = 'success';
-                            $scope.submitted = false;
-                            $scope.initialProfile = {
-                                displayName: $scope.profile.displayName,
-                                teeShirtSize: $scope.profile.teeShirtSize
-                            };
-
-                            $log.info($scope.messages + JSON.stringify(resp.result));
+            conferenceClient.execute('saveProfile', $scope.profile, function (resp) {
+                $scope.$apply(function () {
+                    $scope.loading = false;
+                    if (resp.error) {
+                        // The request has failed.
+                        var errorMessage = resp.error.message || '';
+                        $scope.messages = 'Failed to update a profile : ' + errorMessage;
+                        $scope.alertStatus = 'warning';
+                        $log.error($scope.messages + 'Profile : ' + JSON.stringify($scope.profile));
+
+                        if (resp.code && resp.code == HTTP_ERRORS.UNAUTHORIZED) {
+                            oauth2Provider.showLoginModal();
+                            return;
                         }
-                    });
+                    } else {
+                        // The request has succeeded.
+                        $scope.messages = 'The profile has been updated';
+                        $scope.alertStatus = 'success';
+                        $scope.submitted = false;
+                        $scope.initialProfile = {
+                            displayName: $scope.profile.displayName,
+                            teeShirtSize: $scope.profile.teeShirtSize
+                        };
+
+                        $log.info($scope.messages + JSON.stringify(resp.result));
+                    }
                 });
+            });
         };
     })
 ;
@@ -135,7 +132,7 @@ conferenceApp.controllers.controller('MyProfileCtrl',
  * A controller used for the Create conferences page.
  */
 conferenceApp.controllers.controller('CreateConferenceCtrl',
-    function ($scope, $log, oauth2Provider, HTTP_ERRORS) {
+    function ($scope, $log, oauth2Provider, conferenceClient, HTTP_ERRORS) {
 
         /**
          * The conference object being edited in the page.
@@ -214,31 +211,30 @@ conferenceApp.controllers.controller('CreateConferenceCtrl',
             }
 
             $scope.loading = true;
-            gapi.client.conference.createConference($scope.conference).
-                execute(function (resp) {
-                    $scope.$apply(function () {
-                        $scope.loading = false;
-                        if (resp.error) {
-                            // The request has failed.
-                            var errorMessage = resp.error.message || '';
-                            $scope.messages = 'Failed to create a conference : ' + errorMessage;
-                            $scope.alertStatus = 'warning';
-                            $log.error($scope.messages + ' Conference : ' + JSON.stringify($scope.conference));
-
-                            if (resp.code && resp.code == HTTP_ERRORS.UNAUTHORIZED) {
-                                oauth2Provider.showLoginModal();
-                                return;
-                            }
-                        } else {
-                            // The request has succeeded.
-                            $scope.messages = 'The conference has been created : ' + resp.result.name;
-                            $scope.alertStatus = 'success';
-                            $scope.submitted = false;
-                            $scope.conference = {};
-                            $log.info($scope.messages + ' : ' + JSON.stringify(resp.result));
+            conferenceClient.execute('createConference', $scope.conference, function (resp) {
+                $scope.$apply(function () {
+                    $scope.loading = false;
+                    if (resp.error) {
+                        // The request has failed.
+                        var errorMessage = resp.error.message || '';
+                        $scope.messages = 'Failed to create a conference : ' + errorMessage;
+                        $scope.alertStatus = 'warning';
+                        $log.error($scope.messages + ' Conference : ' + JSON.stringify($scope.conference));
+
+                        if (resp.code && resp.code == HTTP_ERRORS.UNAUTHORIZED) {
+                            oauth2Provider.showLoginModal();
+                            return;
                         }
-                    });
+                    } else {
+                        // The request has succeeded.
+                        $scope.messages = 'The conference has been created : ' + resp.result.name;
+                        $scope.alertStatus = 'success';
+                        $scope.submitted = false;
+                        $scope.conference = {};
+                        $log.info($scope.messages + ' : ' + JSON.stringify(resp.result));
+                    }
                 });
+            });
         };
     });
 
@@ -249,7 +245,7 @@ conferenceApp.controllers.controller('CreateConferenceCtrl',
  * @description
  * A controller used for the Show conferences page.
  */
-conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $log, oauth2Provider, HTTP_ERRORS) {
+conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $log, oauth2Provider, conferenceClient, HTTP_ERRORS) {
 
     /**
      * Holds the status if the query is being executed.
@@ -424,9 +420,17 @@ conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $lo
     };
 
     /**
-     * Invokes the conference.queryConferences API.
+     * Holds the number of conferences per facet value, keyed by the filter field enumValue.
+     * @type {{}}
      */
-    $scope.queryConferencesAll = function () {
+    $scope.facets = {};
+
+    /**
+     * Returns the complete filters in the format the conference API expects.
+     *
+     * @returns {{filters: Array}}
+     */
+    $scope.getSendFilters = function () {
         var sendFilters = {
             filters: []
         }
@@ -440,32 +444,60 @@ conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $lo
                 });
             }
         }
+        return sendFilters;
+    };
+
+    /**
+     * Invokes the conference.getConferenceFacets API to show how many conferences each filter value returns.
+     *
+     * @param sendFilters the filters currently applied.
+     */
+    $scope.getConferenceFacets = function (sendFilters) {
+        conferenceClient.execute('getConferenceFacets', sendFilters, function (resp) {
+            $scope.$apply(function () {
+                if (resp.error) {
+                    $log.error('Failed to get conference facets : ' + (resp.error.message || ''));
+                } else {
+                    $scope.facets = {};
+                    angular.forEach(resp.items, function (facet) {
+                        $scope.facets[facet.field] = facet.counts || [];
+                    });
+                }
+            });
+        });
+    };
+
+    /**
+     * Invokes the conference.queryConferences API.
+     */
+    $scope.queryConferencesAll = function () {
+        var sendFilters = $scope.getSendFilters();
+        $scope.getConferenceFacets(sendFilters);
         $scope.loading = true;
-        gapi.client.conference.queryConferences(sendFilters).
-            execute(function (resp) {
-                $scope.$apply(function () {
-                    $scope.loading = false;
-                    if (resp.error) {
-                        // The request has failed.
-                        var errorMessage = resp.error.message || '';
-                        $scope.messages = 'Failed to query conferences : ' + errorMessage;
-                        $scope.alertStatus = 'warning';
-                        $log.error($scope.messages + ' filters : ' + JSON.stringify(sendFilters));
-                    } else {
-                        // The request has succeeded.
-                        $scope.submitted = false;
-                        $scope.messages = 'Query succeeded : ' + JSON.stringify(sendFilters);
-                        $scope.alertStatus = 'success';
-                        $log.info($scope.messages);
+        conferenceClient.execute('queryConferences', sendFilters, function (resp) {
+            $scope.$apply(function () {
+                $scope.loading = false;
+                if (resp.error) {
+                    // The request has failed.
+                    var errorMessage = resp.error.message || '';
+                    $scope.messages = 'Failed to query conferences : ' + errorMessage;
+                    $scope.alertStatus = 'warning';
+                    $log.error($scope.messages + ' filters : ' + JSON.stringify(sendFilters));
+                } else {
+                    // The request has succeeded.
+                    $scope.submitted = false;
+                    $scope.messages = 'Query succeeded : ' + JSON.stringify(sendFilters);
+                    $scope.alertStatus = 'success';
+                    $log.info($scope.messages);
 
-                        $scope.conferences = [];
-                        angular.forEach(resp.items, function (conference) {
-                            $scope.conferences.push(conference);
-                        });
-                    }
-                    $scope.submitted = true;
-                });
+                    $scope.conferences = [];
+                    angular.forEach(resp.items, function (conference) {
+                        $scope.conferences.push(conference);
+                    });
+                }
+                $scope.submitted = true;
             });
+        });
     }
 
     /**
@@ -473,36 +505,35 @@ conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $lo
      */
     $scope.getConferencesCreated = function () {
         $scope.loading = true;
-        gapi.client.conference.getConferencesCreated().
-            execute(function (resp) {
-                $scope.$apply(function () {
-                    $scope.loading = false;
-                    if (resp.error) {
-                        // The request has failed.
-                        var errorMessage = resp.error.message || '';
-                        $scope.messages = 'Failed to query the conferences created : ' + errorMessage;
-                        $scope.alertStatus = 'warning';
-                        $log.error($scope.messages);
-
-                        if (resp.code && resp.code == HTTP_ERRORS.UNAUTHORIZED) {
-                            oauth2Provider.showLoginModal();
-                            return;
-                        }
-                    } else {
-                        // The request has succeeded.
-                        $scope.submitted = false;
-                        $scope.messages = 'Query succeeded : Conferences you have created';
-                        $scope.alertStatus = 'success';
-                        $log.info($scope.messages);
+        conferenceClient.execute('getConferencesCreated', null, function (resp) {
+            $scope.$apply(function () {
+                $scope.loading = false;
+                if (resp.error) {
+                    // The request has failed.
+                    var errorMessage = resp.error.message || '';
+                    $scope.messages = 'Failed to query the conferences created : ' + errorMessage;
+                    $scope.alertStatus = 'warning';
+                    $log.error($scope.messages);
 
-                        $scope.conferences = [];
-                        angular.forEach(resp.items, function (conference) {
-                            $scope.conferences.push(conference);
-                        });
+                    if (resp.code && resp.code == HTTP_ERRORS.UNAUTHORIZED) {
+                        oauth2Provider.showLoginModal();
+                        return;
                     }
-                    $scope.submitted = true;
-                });
+                } else {
+                    // The request has succeeded.
+                    $scope.submitted = false;
+                    $scope.messages = 'Query succeeded : Conferences you have created';
+                    $scope.alertStatus = 'success';
+                    $log.info($scope.messages);
+
+                    $scope.conferences = [];
+                    angular.forEach(resp.items, function (conference) {
+                        $scope.conferences.push(conference);
+                    });
+                }
+                $scope.submitted = true;
             });
+        });
     };
 
     /**
@@ -511,31 +542,62 @@ conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $lo
      */
     $scope.getConferencesAttend = function () {
         $scope.loading = true;
-        gapi.client.conference.getConferencesToAttend().
-            execute(function (resp) {
-                $scope.$apply(function () {
-                    if (resp.error) {
-                        // The request has failed.
-                        var errorMessage = resp.error.message || '';
-                        $scope.messages = 'Failed to query the conferences to attend : ' + errorMessage;
-                        $scope.alertStatus = 'warning';
-                        $log.error($scope.messages);
+        conferenceClient.execute('getConferencesToAttend', null, function (resp) {
+            $scope.$apply(function () {
+                if (resp.error) {
+                    // The request has failed.
+                    var errorMessage = resp.error.message || '';
+                    $scope.messages = 'Failed to query the conferences to attend : ' + errorMessage;
+                    $scope.alertStatus = 'warning';
+                    $log.error($scope.messages);
 
-                        if (resp.code && resp.code == HTTP_ERRORS.UNAUTHORIZED) {
-                            oauth2Provider.showLoginModal();
-                            return;
-                        }
-                    } else {
-                        // The request has succeeded.
-                        $scope.conferences = resp.result.items;
-                        $scope.loading = false;
-                        $scope.messages = 'Query succeeded : Conferences you will attend (or you have attended)';
-                        $scope.alertStatus = 'success';
-                        $log.info($scope.messages);
+                    if (resp.code && resp.code == HTTP_ERRORS.UNAUTHORIZED) {
+                        oauth2Provider.showLoginModal();
+                        return;
                     }
-                    $scope.submitted = true;
-                });
+                } else {
+                    // The request has succeeded.
+                    $scope.conferences = resp.result.items;
+                    $scope.loading = false;
+                    $scope.messages = 'Query succeeded : Conferences you will attend (or you have attended)';
+                    $scope.alertStatus = 'success';
+                    $log.info($scope.messages);
+                }
+                $scope.submitted = true;
+            });
+        });
+    };
+});
+
+
+/**
+ * @ngdoc controller
+ * @name TrendingConferencesCtrl
+ *
+ * @description
+ * A controller used for the most popular conferences list on the home page.
+ */
+conferenceApp.controllers.controller('TrendingConferencesCtrl', function ($scope, $log, conferenceClient) {
+
+    /**
+     * Holds the trending conferences, most popular first.
+     * @type {Array}
+     */
+    $scope.conferences = [];
+
+    /**
+     * Invokes the conference.getTrendingConferences method.
+     */
+    $scope.init = function () {
+        conferenceClient.execute('getTrendingConferences', null, function (resp) {
+            $scope.$apply(function () {
+                if (resp.error) {
+                    $log.error('Failed to get trending conferences : ' + (resp.error.message || ''));
+                } else {
+                    $scope.conferences = resp.result.items || [];
+                }
             });
+        });
     };
 });
 
@@ -547,7 +609,7 @@ conferenceApp.controllers.controller('ShowConferenceCtrl', function ($scope, $lo
  * @description
  * A controller used for the conference detail page.
  */
-conferenceApp.controllers.controller('ConferenceDetailCtrl', function ($scope, $log, $routeParams, HTTP_ERRORS) {
+conferenceApp.controllers.controller('ConferenceDetailCtrl', function ($scope, $log, $routeParams, conferenceClient, HTTP_ERRORS) {
     $scope.conference = {};
 
     $scope.isUserAttending = false;
@@ -559,9 +621,9 @@ conferenceApp.controllers.controller('ConferenceDetailCtrl', function ($scope, $
      */
     $scope.init = function () {
         $scope.loading = true;
-        gapi.client.conference.getConference({
+        conferenceClient.execute('getConference', {
             websafeConferenceKey: $routeParams.websafeConferenceKey
-        }).execute(function (resp) {
+        }, function (resp) {
             $scope.$apply(function () {
                 $scope.loading = false;
                 if (resp.error) {
@@ -581,7 +643,7 @@ conferenceApp.controllers.controller('ConferenceDetailCtrl', function ($scope, $
 
         $scope.loading = true;
         // If the user is attending the conference, updates the status message and available function.
-        gapi.client.conference.getProfile().execute(function (resp) {
+        conferenceClient.execute('getProfile', null, function (resp) {
             $scope.$apply(function () {
                 $scope.loading = false;
                 if (resp.error) {
@@ -602,14 +664,31 @@ conferenceApp.controllers.controller('ConferenceDetailCtrl', function ($scope, $
     };
 
 
+    /**
+     * Invokes the conference.getSeatsAvailable method, a cheap cached read for polling the registered count.
+     */
+    $scope.refreshSeatsAvailable = function () {
+        conferenceClient.execute('getSeatsAvailable', {
+            websafeConferenceKey: $routeParams.websafeConferenceKey
+        }, function (resp) {
+            $scope.$apply(function () {
+                if (resp.error) {
+                    $log.error('Failed to get seats available : ' + (resp.error.message || ''));
+                } else if ($scope.conference) {
+                    $scope.conference.seatsAvailable = resp.result.seatsAvailable;
+                }
+            });
+        });
+    };
+
     /**
      * Invokes the conference.registerForConference method.
      */
     $scope.registerForConference = function () {
         $scope.loading = true;
-        gapi.client.conference.registerForConference({
+        conferenceClient.execute('registerForConference', {
             websafeConferenceKey: $routeParams.websafeConferenceKey
-        }).execute(function (resp) {
+        }, function (resp) {
             $scope.$apply(function () {
                 $scope.loading = false;
                 if (resp.error) {
@@ -644,9 +723,9 @@ conferenceApp.controllers.controller('ConferenceDetailCtrl', function ($scope, $
      */
     $scope.unregisterFromConference = function () {
         $scope.loading = true;
-        gapi.client.conference.unregisterFromConference({
+        conferenceClient.execute('unregisterFromConference', {
             websafeConferenceKey: $routeParams.websafeConferenceKey
-        }).execute(function (resp) {
+        }, function (resp) {
             $scope.$apply(function () {
                 $scope.loading = false;
                 if (resp.error) {
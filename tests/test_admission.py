@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+"""test_admission.py
+
+Udacity conference admission control tests; run against the App Engine
+SDK's memcache stub and are skipped when the SDK is not importable:
+
+    PYTHONPATH=path/to/google_appengine python -m pytest tests
+
+"""
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    import httplib
+
+    import dev_appserver
+    dev_appserver.fix_sys_path()
+    from google.appengine.ext import testbed
+    import admission
+    from models import RateLimitedException
+except ImportError:
+    testbed = None
+
+
+@unittest.skipIf(testbed is None, 'App Engine SDK not importable')
+class AdmitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.testbed = testbed.Testbed()
+        self.testbed.activate()
+        self.testbed.init_memcache_stub()
+        limits = {'registerForConference': {'user': (0.5, 2)}}
+        self.addCleanup(setattr, admission, 'RATE_LIMITS',
+                        admission.RATE_LIMITS)
+        admission.RATE_LIMITS = limits
+
+    def tearDown(self):
+        self.testbed.deactivate()
+
+    def test_rejects_beyond_burst(self):
+        for _ in range(2):
+            admission.admit('registerForConference', user='ann@example.com')
+
+        with self.assertRaises(RateLimitedException) as raised:
+            admission.admit('registerForConference', user='ann@example.com')
+
+        self.assertEqual(httplib.SERVICE_UNAVAILABLE,
+                         raised.exception.http_status)
+        self.assertIn('retry after 2 seconds', str(raised.exception))
+
+    def test_buckets_are_per_user(self):
+        for _ in range(2):
+            admission.admit('registerForConference', user='ann@example.com')
+
+        admission.admit('registerForConference', user='bob@example.com')
+
+    def test_exception_is_constructible(self):
+        # endpoints looks the status up in httplib.responses on construction
+        error = RateLimitedException('Too many requests.')
+        self.assertEqual(httplib.SERVICE_UNAVAILABLE, error.http_status)
+
+
+if __name__ == '__main__':
+    unittest.main()
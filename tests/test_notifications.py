@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""test_notifications.py
+
+Udacity conference confirmation mail pipeline tests; run against the App
+Engine SDK's datastore, task queue and mail stubs, and are skipped when
+the SDK is not importable:
+
+    PYTHONPATH=path/to/google_appengine python -m pytest tests
+
+"""
+
+import os
+import sys
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    import dev_appserver
+    dev_appserver.fix_sys_path()
+    from google.appengine.ext import ndb
+    from google.appengine.ext import testbed
+    from google.appengine.runtime import apiproxy_errors
+    import notifications
+    from models import Conference
+except ImportError:
+    testbed = None
+
+
+@unittest.skipIf(testbed is None, 'App Engine SDK not importable')
+class SendPendingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.testbed = testbed.Testbed()
+        self.testbed.activate()
+        self.testbed.init_datastore_v3_stub()
+        self.testbed.init_memcache_stub()
+        self.testbed.init_app_identity_stub()
+        self.testbed.init_mail_stub()
+        self.testbed.init_taskqueue_stub(root_path=ROOT)
+        ndb.get_context().clear_cache()
+        self.mail = self.testbed.get_stub(testbed.MAIL_SERVICE_NAME)
+        self.tasks = self.testbed.get_stub(testbed.TASKQUEUE_SERVICE_NAME)
+
+    def tearDown(self):
+        self.testbed.deactivate()
+
+    def _patch(self, obj, name, value):
+        """Set obj.name to value for the rest of the test."""
+        self.addCleanup(setattr, obj, name, getattr(obj, name))
+        setattr(obj, name, value)
+
+    def _failSends(self, error):
+        """Make every send_mail raise error; return the list of calls."""
+        calls = []
+
+        def send_mail(*args):
+            calls.append(args)
+            raise error
+        self._patch(notifications.mail, 'send_mail', send_mail)
+        return calls
+
+    def _conference(self, name, email):
+        c_key = Conference(name=name, city='Paris',
+                           organizerUserId=email).put()
+        notifications.queueConferenceCreated(email, c_key)
+        return c_key
+
+    def _pending(self):
+        return self.tasks.GetTasks(notifications.CONFIRMATION_QUEUE)
+
+    def test_one_digest_per_recipient(self):
+        self._conference('PyCon', 'ann@example.com')
+        self._conference('JSConf', 'ann@example.com')
+        self._conference('GopherCon', 'bob@example.com')
+
+        notifications.sendPending()
+
+        ann = self.mail.get_sent_messages(to='ann@example.com')
+        bob = self.mail.get_sent_messages(to='bob@example.com')
+        self.assertEqual(1, len(ann))
+        self.assertEqual(1, len(bob))
+        self.assertEqual('You created 2 new Conferences!', ann[0].subject)
+        body = ann[0].body.decode()
+        self.assertIn('JSConf', body)
+        self.assertIn('PyCon', body)
+        self.assertEqual([], self._pending())
+
+    def test_deleted_conference_is_dropped(self):
+        self._conference('PyCon', 'ann@example.com').delete()
+
+        notifications.sendPending()
+
+        self.assertEqual([], self.mail.get_sent_messages())
+        self.assertEqual([], self._pending())
+
+    def test_failed_digest_is_retried(self):
+        self._conference('PyCon', 'ann@example.com')
+        self._patch(notifications, 'SEND_BACKOFF', 0)
+        calls = self._failSends(Exception('backend error'))
+
+        notifications.sendPending()
+
+        self.assertEqual(notifications.SEND_ATTEMPTS, len(calls))
+        self.assertEqual(1, len(self._pending()))
+
+    def test_expired_digest_is_dropped(self):
+        self._conference('PyCon', 'ann@example.com')
+        self._patch(notifications, 'SEND_BACKOFF', 0)
+        self._failSends(Exception('backend error'))
+        later = time.time() + notifications.MAX_TASK_AGE + 1
+        self._patch(notifications.time, 'time', lambda: later)
+
+        notifications.sendPending()
+
+        self.assertEqual([], self._pending())
+
+    def test_over_quota_defers_without_failing(self):
+        self._conference('PyCon', 'ann@example.com')
+        self._conference('GopherCon', 'bob@example.com')
+        self._patch(notifications, 'MAIL_CONCURRENCY', 1)
+        calls = self._failSends(apiproxy_errors.OverQuotaError())
+        backedOff = []
+        self._patch(notifications, '_backoff',
+                    lambda queue, tasks: backedOff.extend(tasks))
+
+        notifications.sendPending()
+
+        # the worker stops at the first over-quota send, and neither
+        # confirmation is backed off as a failure
+        self.assertEqual(1, len(calls))
+        self.assertEqual([], backedOff)
+        self.assertEqual(2, len(self._pending()))
+
+
+if __name__ == '__main__':
+    unittest.main()
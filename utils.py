@@ -1,9 +1,10 @@
 import json
 import os
+import random
+import threading
 import time
 import uuid
 
-from google.appengine.api import urlfetch
 from models import Profile
 
 def getUserId(user, id_type="email"):
@@ -12,6 +13,8 @@ def getUserId(user, id_type="email"):
 
     if id_type == "oauth":
         """A workaround implementation for getting userid."""
+        # only this rarely used mode needs urlfetch; keep it off cold starts
+        from google.appengine.api import urlfetch
         auth = os.getenv('HTTP_AUTHORIZATION')
         bearer, token = auth.split()
         token_type = 'id_token'
@@ -43,3 +46,55 @@ def getUserId(user, id_type="email"):
             return profile.id()
         else:
             return str(uuid.uuid1().get_hex())
+
+
+class LocalCache(object):
+    """In-process TTL cache for hot, small values that tolerate brief
+    staleness. Expiry is jittered so instances do not refresh in lockstep,
+    and only one thread per key refills while others keep the stale value.
+    Values are (version, data) pairs; a refill never replaces a newer one.
+    """
+
+    def __init__(self, ttl, jitter=0.25):
+        self.ttl = ttl
+        self.jitter = jitter
+        self._entries = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, key):
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _expiry(self):
+        return time.time() + self.ttl * (1 + random.uniform(-self.jitter,
+                                                            self.jitter))
+
+    def set(self, key, value):
+        """Store (version, data) unless a newer version is cached, in which
+        case the cached one is kept for another ttl.
+        """
+        current = self._entries.get(key)
+        if current and current[0][0] > value[0]:
+            value = current[0]
+        self._entries[key] = (value, self._expiry())
+
+    def get(self, key, loader):
+        """Return cached (version, data), refilling from loader() when
+        expired.
+        """
+        entry = self._entries.get(key)
+        if entry and entry[1] > time.time():
+            return entry[0]
+        lock = self._lock(key)
+        # single flight: serve stale while another thread refills
+        if not lock.acquire(entry is None):
+            return entry[0]
+        try:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.time():
+                return entry[0]
+            self.set(key, loader())
+            return self._entries[key][0]
+        finally:
+            lock.release()